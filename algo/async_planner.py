@@ -0,0 +1,72 @@
+import numpy as np
+import sys
+import os
+import asyncio
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.grid import Grid
+
+from .planner import PathPlanner
+
+"""
+asyncio front end for the planners.
+
+plan_path_async runs plan_path in an executor (the loop's default thread pool unless one is
+given), so the event loop keeps running while the search does. Cancelling the awaiting task
+cancels its CancellationToken; the search polls the token once per expansion (PathPlanner
+should_stop), stops within one expansion and drops its node store. A token can also be passed
+in and cancelled from elsewhere.
+
+plan_many_async plans many pairs with asyncio.gather, running at most 'limit' searches at a time
+(asyncio.Semaphore). The occupancy grid is wrapped in one Grid shared by all queries, so its
+lazily built tables are built once (under the Grid's lock). Other keyword arguments go to every
+query, and the concurrent queries share them: a footprint's inflated Grid is cached under the
+same lock, and a PathCache guards its entries with its own lock.
+"""
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def __call__(self):
+        return self._event.is_set()  # Usable directly as a should_stop callback
+
+
+async def plan_path_async(start_coords, end_coords, occupancy_grid, origin=None, loose=1, algorithm='bfs', mode='cell', storage=None, snap=False, footprint=None, attempted_path=False, cache=None, corridor=False, compact=False, token=None, executor=None):
+    """plan_path without blocking the event loop; a cancelled query returns nothing and raises CancelledError."""
+    if token is None:
+        token = CancellationToken()
+
+    def run():
+        if token.cancelled:
+            return None  # Cancelled while waiting for an executor thread, before any Grid is built
+        planner = PathPlanner(start_coords, end_coords, occupancy_grid, origin, loose, algorithm, mode, storage, snap,
+                              footprint, attempted_path, cache, corridor, compact, should_stop=token)
+        return planner.plan_path()
+
+    future = asyncio.get_running_loop().run_in_executor(executor, run)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        token.cancel()  # The executor thread cannot be interrupted, so stop the search cooperatively
+        raise
+
+
+async def plan_many_async(pairs, occupancy_grid, limit=4, origin=None, loose=1, executor=None, **kwargs):
+    """Plan every (start, goal) pair, at most 'limit' at once; results in input order."""
+    if not isinstance(occupancy_grid, Grid):
+        occupancy_grid = Grid(np.asarray(occupancy_grid), loose=loose, origin=origin)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def plan_one(start_coords, end_coords):
+        async with semaphore:
+            return await plan_path_async(start_coords, end_coords, occupancy_grid, executor=executor, **kwargs)
+
+    return await asyncio.gather(*(plan_one(start, end) for start, end in pairs))
@@ -0,0 +1,86 @@
+import numpy as np
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.grid import Grid
+
+from .context import PlanningContext
+
+"""
+Batch planning of many independent start/goal pairs over one occupancy grid.
+
+With workers=N the occupancy grid and the precomputed search tables (sentinel-padded
+occupancy, component labels and, in vertex mode, the vertex edge words; see
+Grid.shared_tables) are copied once into multiprocessing.shared_memory blocks. Each worker
+process attaches to them and wraps them in NumPy arrays without copying, so the grid is never
+pickled per task or per worker. Results come back as compact utils.results.PathResult objects
+in input order.
+
+timeout limits the search time of each pair (seconds); a pair that runs out of time gives None.
+"""
+
+def plan_many(pairs, occupancy_grid, loose=1, mode='cell', origin=None, algorithm='bfs', workers=None, timeout=None):
+    """Plan every (start, goal) pair; returns one PathResult (or None on timeout) per pair, in order."""
+    pairs = [(np.array(start, dtype=int), np.array(goal, dtype=int)) for start, goal in pairs]
+    if isinstance(occupancy_grid, Grid):
+        grid = occupancy_grid
+    else:
+        grid = Grid(np.asarray(occupancy_grid), loose=loose, origin=origin)
+
+    if workers is None or workers <= 1 or len(pairs) <= 1:
+        context = PlanningContext(grid, mode=mode, algorithm=algorithm, compact=True)
+        return [_plan_pair(context, start, goal, timeout) for start, goal in pairs]
+
+    # Copy the occupancy and every table the searches read into shared memory, once
+    arrays = {'occupancy': np.asarray(grid.occupancy_grid)}
+    arrays.update(grid.shared_tables(mode))
+    blocks = []
+    try:
+        specs = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                 initargs=(specs, grid.loose, grid.origin, mode, algorithm)) as pool:
+            tasks = [(start, goal, timeout) for start, goal in pairs]
+            return list(pool.map(_plan_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def _plan_pair(context, start, goal, timeout):
+    should_stop = None
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+        should_stop = lambda: time.monotonic() > deadline
+    result = context.plan(start, goal, should_stop=should_stop)
+    return None if context.stopped else result
+
+# Per-process state: the shared-memory blocks (kept open while the worker lives) and its context
+_worker_blocks = []
+_worker_context = None
+
+def _attach_worker(specs, loose, origin, mode, algorithm):
+    global _worker_context
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)  # Zero-copy view
+
+    grid = Grid(arrays.pop('occupancy'), loose=loose, origin=origin, padded_occupancy=arrays.pop('padded_occupancy', None))
+    grid.adopt_tables(mode, arrays)
+    _worker_context = PlanningContext(grid, mode=mode, algorithm=algorithm, compact=True)
+    sys.stdout = open(os.devnull, 'w')  # Keep per-node search logs of many workers off the terminal
+
+def _plan_task(task):
+    start, goal, timeout = task
+    return _plan_pair(_worker_context, start, goal, timeout)
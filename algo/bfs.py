@@ -8,15 +8,104 @@ from utils.raytracer import Raytracer
 
 class BFS:
     """Breadth-First Search algorithm implementation with raytracing integration."""
-    def __init__(self, grid, nodes, start_coords, end_coords, mode):
+    def __init__(self, grid, nodes, start_coords, end_coords, mode, direction_table=None, allowed=None, should_stop=None):
         self.grid = grid
         self.nodes = nodes
         self.start_coords = np.array(start_coords, dtype=int)
         self.end_coords = np.array(end_coords, dtype=int)
         self.mode = mode
+        self.should_stop = should_stop  # Optional callable polled once per expansion, e.g. for timeouts
+        self.stopped = False
+        
+        # Flat-index fast path over the grid's sentinel-padded occupancy. Node coordinates are
+        # grid indices, so it is only used when they coincide with world coordinates (zero origin).
+        # A table from an earlier search on the same grid, mode and occupancy version can be reused.
+        self.use_padded = grid.padded_occupancy is not None and not np.any(grid.origin)
+        self.direction_table = None
+        if self.use_padded:
+            self.direction_table = direction_table if direction_table is not None else self._build_direction_table()
+            vars(self).update(self.direction_table)
+        
+        # Optional (lo, mask) restricting the search to the True nodes of a box, e.g. a corridor: mask is a
+        # bool array over the nodes lo .. lo + mask.shape - 1 (array order), nodes outside the box are excluded
+        self.allowed = None
+        if allowed is not None:
+            self.allowed_lo = np.asarray(allowed[0], dtype=np.int64)[::-1]  # Coordinate order
+            self.allowed = allowed[1]
+            self.allowed_shape = np.array(self.allowed.shape[::-1])
+    
+    def _build_direction_table(self):
+        """Precompute per-direction flat offsets for node bounds and edge occupancy checks."""
+        strides = self.grid.padded_strides
+        edge_cells = self.grid.edge_cell_offsets(self.mode)
+        directions = self.grid.direction_array()
+        node_offsets = self.grid.direction_flat_offsets()
+        
+        table = {
+            'directions': directions,
+            'node_offsets': node_offsets,
+            'edge_offsets': np.concatenate([cells @ strides for cells in edge_cells]),
+            'edge_starts': np.cumsum([0] + [len(cells) for cells in edge_cells[:-1]]),
+            'flat_strides': strides,
+            'flat_base': int(strides.sum()),  # Padding shifts every index by one along each axis
+            'node_mask': self.grid.node_mask(self.mode),
+            'padded_flat': self.grid.padded_flat,
+        }
+        
+        # Vertex mode reads precomputed edge bits instead of the intersected cells. An edge along a
+        # negative direction -d is stored once, as the +d edge of the neighbor.
+        edge_words = self.grid.vertex_edge_words() if self.mode == 'vertex' else None
+        table['edge_words'] = edge_words
+        if edge_words is not None:
+            half_index = {direction: bit for bit, direction in enumerate(self.grid.half_directions())}
+            direction_list = [tuple(d) for d in directions.tolist()]
+            positive = np.array([d in half_index for d in direction_list])
+            table['word_offsets'] = np.where(positive, 0, node_offsets)
+            table['word_bits'] = np.array([half_index[d] if d in half_index else half_index[tuple(-c for c in d)]
+                                           for d in direction_list], dtype=edge_words.dtype)
+        return table
+    
+    def _get_neighbors_padded(self, coords):
+        """Get valid neighboring coordinates using precomputed flat offsets (no bounds checks)."""
+        neighbors = []
+        coords_array = np.asarray(coords)
+        base = int(coords_array @ self.flat_strides) + self.flat_base
+        
+        # Sentinels make out-of-grid nodes invalid and out-of-grid cells occupied
+        valid = self.node_mask[base + self.node_offsets]
+        if self.allowed is not None:
+            valid &= self._allowed_many(coords_array + self.directions)
+        if self.edge_words is not None:
+            blocked = ((self.edge_words[base + self.word_offsets] >> self.word_bits) & 1) == 0
+        else:
+            blocked = np.logical_and.reduceat(self.padded_flat[base + self.edge_offsets], self.edge_starts)
+        
+        for k in np.flatnonzero(valid):
+            neighbor = coords_array + self.directions[k]
+            neighbor_node = self.nodes.get_node_unchecked(tuple(neighbor))
+            if neighbor_node.expanded:
+                continue
+            
+            # The neighbor is accessible if NOT ALL intersected cells are occupied
+            if not blocked[k]:
+                print(f"Neighbor {neighbor} is accessible from {coords} via raytracing")
+                neighbors.append(neighbor)
+        
+        return neighbors
+    
+    def _allowed_many(self, neighbors):
+        """Whether each of an (M, D) array of nodes lies in the allowed box and is True in its mask."""
+        relative = neighbors - self.allowed_lo
+        inside = np.all((relative >= 0) & (relative < self.allowed_shape), axis=1)
+        allowed = np.zeros(len(neighbors), dtype=bool)
+        allowed[inside] = self.allowed[tuple(relative[inside][:, ::-1].T)]
+        return allowed
     
     def _get_neighbors(self, coords):
         """Get valid neighboring coordinates using raytracing."""
+        if self.use_padded:
+            return self._get_neighbors_padded(coords)
+        
         neighbors = []
         coords_array = np.array(coords)
         
@@ -26,6 +115,8 @@ class BFS:
         else:  # cell mode
             current_raytracing = coords_array + 0.5
         
+        # Trace every candidate edge first so all intersected cells can be checked in one batch
+        candidates = []
         for direction in self.grid.valid_directions:
             neighbor = coords_array + np.array(direction)
             neighbor_node = self.nodes.getNode(*neighbor)
@@ -33,6 +124,9 @@ class BFS:
             if neighbor_node is None or neighbor_node.expanded:
                 continue
             
+            if self.allowed is not None and not self._allowed_many(neighbor[None, :])[0]:
+                continue
+            
             if not self.grid.is_within_bounds_for_mode(neighbor, self.mode):
                 print(f"Neighbor {neighbor} is out of bounds for mode {self.mode}")
                 continue  # Skip out-of-bounds neighbors
@@ -43,15 +137,27 @@ class BFS:
             else:  # cell mode
                 neighbor_raytracing = neighbor + 0.5
             
-            # Use raytracer to trace from current to neighbor and check accessibility
-            if self._is_neighbor_accessible(current_raytracing, neighbor_raytracing):
+            intersected_cells = self._get_intersected_cells(current_raytracing, neighbor_raytracing)
+            if intersected_cells is not None:
+                candidates.append((neighbor, intersected_cells))
+        
+        if not candidates:
+            return neighbors
+        
+        # Use raytracer results to check accessibility of all candidates with a single occupancy query
+        free = self._free_cells_mask(np.concatenate([cells for _, cells in candidates]))
+        offset = 0
+        for neighbor, intersected_cells in candidates:
+            # The neighbor is accessible if NOT ALL intersected cells are occupied
+            if free[offset:offset + len(intersected_cells)].any():
                 print(f"Neighbor {neighbor} is accessible from {coords} via raytracing")
                 neighbors.append(neighbor)
+            offset += len(intersected_cells)
 
         return neighbors
     
-    def _is_neighbor_accessible(self, start_ray, end_ray):
-        """Check if a neighbor is accessible by tracing the ray and checking intersected cells."""
+    def _get_intersected_cells(self, start_ray, end_ray):
+        """Trace the ray between two nodes and return the intersected cells as an (N, D) int array."""
         try:
             # Create raytracer for this specific ray
             raytracer = Raytracer(self.grid.dimensions, start_ray, end_ray)
@@ -64,18 +170,27 @@ class BFS:
                 current_node = tuple((start_ray - 0.5).astype(int))  # Convert current ray position to grid coordinates
                 intersected_cells = [cell for cell in intersected_cells if tuple(cell) != current_node]
             
-            # The neighbor is accessible if NOT ALL intersected cells are occupied
-            # This allows navigation around obstacles in vertex mode
-            for cell_coords in intersected_cells:
-                # Check if cell is within grid bounds
-                if self._is_within_bounds(cell_coords) and not self.grid.is_cell_occupied(cell_coords):
-                    return True  # Found at least one free cell - movement is allowed
-            
-            return False  # All valid intersected cells are occupied - movement blocked
+            return np.array(intersected_cells, dtype=int).reshape(-1, self.grid.dimensions)
         
         except Exception as e:
             print(f"Error in raytracing: {e}")
+            return None
+    
+    def _free_cells_mask(self, cells):
+        """Free (in bounds and unoccupied) mask for an (N, D) array of cells."""
+        bounds = self.grid.num_vertices if self.mode == 'vertex' else self.grid.num_cells
+        in_bounds = np.all((cells >= 0) & (cells < bounds), axis=1)
+        return in_bounds & ~self.grid.occupied_many(cells)
+    
+    def _is_neighbor_accessible(self, start_ray, end_ray):
+        """Check if a neighbor is accessible by tracing the ray and checking intersected cells."""
+        intersected_cells = self._get_intersected_cells(start_ray, end_ray)
+        if intersected_cells is None:
             return False
+        
+        # The neighbor is accessible if NOT ALL intersected cells are occupied
+        # This allows navigation around obstacles in vertex mode
+        return bool(self._free_cells_mask(intersected_cells).any())
     
     def _is_within_bounds(self, cell_coords):
         """Check if cell coordinates are within grid bounds."""
@@ -103,6 +218,12 @@ class BFS:
         queue = deque([start_coords])
         
         while queue:
+            if self.should_stop is not None and self.should_stop():
+                self.stopped = True
+                self.nodes.reset()  # Release the explored nodes now, not when the planner is dropped
+                print("⏹ Search stopped before completion")
+                return []
+            
             current = queue.popleft()
             
             if np.array_equal(current, end_coords):
@@ -0,0 +1,76 @@
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.grid import Grid
+
+from .planner import PathPlanner
+
+"""
+Reusable planning state for answering many queries on one occupancy grid.
+
+plan_path builds a new Grid, Nodes store and search tables on every call. A PlanningContext
+builds each of them once, on first use, and keeps them between queries:
+- the Grid, with its own lazily built caches (direction tables, vertex edge words, component labels)
+- one PathPlanner whose Nodes store is reset, not rebuilt, before every query
+- the search direction table of the last query
+- optionally, a PathCache (algo.path_cache) of complete paths, invalidated cell by cell
+- the component labels used to reject disconnected pairs without a search (check_connectivity,
+  built on the first query of a dense grid)
+
+Grid.version is checked before every query, so the search tables are rebuilt after update_cells
+changes the occupancy; the Grid invalidates or patches its own caches.
+"""
+class PlanningContext:
+    def __init__(self, occupancy_grid, loose=1, mode='cell', origin=None, algorithm='bfs', storage=None, cache=None, compact=False, check_connectivity=True):
+        if isinstance(occupancy_grid, Grid):
+            self.grid = occupancy_grid  # Shared as-is, origin/loose/storage are ignored
+        else:
+            self.grid = Grid(occupancy_grid, loose=loose, origin=origin, storage=storage)
+        self.mode = mode.lower()
+        self.algorithm = algorithm.lower()
+        if self.mode not in ['cell', 'vertex']:
+            raise ValueError(f"Mode '{self.mode}' not supported. Use 'cell' or 'vertex'")
+
+        self.cache = cache
+        self.compact = compact          # Return utils.results.PathResult objects
+        self.check_connectivity = check_connectivity  # Reject disconnected pairs via component labels
+        self._planner = None            # Built on the first query
+        self._version = self.grid.version
+        self.query_count = 0
+
+    def _get_planner(self, start_coords, goal_coords, attempted_path, should_stop=None):
+        if self._planner is None:
+            self._planner = PathPlanner(start_coords, goal_coords, self.grid, algorithm=self.algorithm, mode=self.mode,
+                                        cache=self.cache, compact=self.compact, check_connectivity=self.check_connectivity)
+        else:
+            self._planner.start_coords = np.array(start_coords, dtype=int)
+            self._planner.end_coords = np.array(goal_coords, dtype=int)
+            self._planner.nodes.reset()
+        self._planner.attempted_path = attempted_path
+        self._planner.should_stop = should_stop
+
+        if self.grid.version != self._version:
+            self._planner.direction_table = None  # Edge tables describe the old occupancy
+            self._version = self.grid.version
+        return self._planner
+
+    def plan(self, start_coords, goal_coords, attempted_path=False, should_stop=None):
+        """Plan one path, reusing everything built by earlier queries (see PathPlanner.plan_path)."""
+        planner = self._get_planner(start_coords, goal_coords, attempted_path, should_stop)
+        self.query_count += 1
+        return planner.plan_path()
+
+    @property
+    def stopped(self):
+        """True if the last query's search was abandoned because its should_stop callback returned True."""
+        return self._planner is not None and self._planner.stopped
+
+    def is_connected(self, start_coords, goal_coords):
+        """True if the goal node is reachable from the start node (component labels, no search)."""
+        return self.grid.are_connected(start_coords, goal_coords, self.mode)
+
+    def update_cells(self, cell_coords, occupied=True):
+        """Change the occupancy through the grid; see Grid.update_cells."""
+        self.grid.update_cells(cell_coords, occupied)
@@ -0,0 +1,150 @@
+import numpy as np
+import sys
+import os
+import threading
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.raytracer import Raytracer
+
+DEFAULT_PATH_CACHE_BYTES = 16 * 1024 * 1024  # Default budget for cached paths and their swept cells (16 MiB)
+
+"""
+Bounded LRU cache of planned paths, invalidated by occupancy changes along the cached paths.
+
+Entries are keyed by (start, goal, loose, mode, algorithm, grid uid). Only complete paths are
+cached. Each entry also stores the swept supercover of the path: every cell intersected by its
+segments (as traced by Raytracer), plus the cells the endpoint checks depend on. An inverted
+index maps each of those cells to the entries that sweep it.
+
+The cache registers itself as a change listener on every grid it serves, so when update_cells
+changes a cell only the entries sweeping that cell are dropped. A cached path therefore stays
+collision-free, but freeing cells elsewhere may open a shorter path the cache will not notice
+(call invalidate_all() if that matters). Share one Grid between queries (e.g. through
+algo.context.PlanningContext) for entries to be found again. All methods take the cache's lock,
+so one cache can serve planners on several threads.
+"""
+class PathCache:
+    def __init__(self, max_entries=1024, max_bytes=DEFAULT_PATH_CACHE_BYTES):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+
+        self.entries = OrderedDict()  # key -> (path, swept cells, nbytes), least recently used first
+        self.cell_index = {}          # (grid uid, cell) -> keys of entries sweeping that cell
+        self.resident_bytes = 0
+        self._listening = set()       # uids of grids this cache is registered with
+        self._lock = threading.RLock()
+
+        # Cache counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(grid, start_coords, end_coords, mode, algorithm):
+        return (tuple(int(c) for c in start_coords), tuple(int(c) for c in end_coords),
+                grid.loose, mode, algorithm, grid.uid)
+
+    def get(self, key):
+        """Cached path for the key (as a new list), or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return list(entry[0])
+
+    def put(self, grid, key, path):
+        """Cache a complete path planned on the grid."""
+        cells = self._swept_cells(grid, path, key[3])  # Raytracing needs no lock
+        nbytes = cells.nbytes + len(path) * grid.dimensions * 8
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            if grid.uid not in self._listening:
+                grid.add_change_listener(self._on_cells_changed)
+                self._listening.add(grid.uid)
+            if nbytes > self.max_bytes:
+                return  # Would evict everything else and still not fit
+
+            # Evict least recently used entries until the new one fits both limits
+            while self.entries and (len(self.entries) >= self.max_entries or self.resident_bytes + nbytes > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+            self.entries[key] = (list(path), cells, nbytes)
+            self.resident_bytes += nbytes
+            for cell in map(tuple, cells.tolist()):
+                self.cell_index.setdefault((grid.uid, cell), set()).add(key)
+
+    def _swept_cells(self, grid, path, mode):
+        """Unique cells whose occupancy the path depends on, as an (N, D) int array."""
+        points = np.array(path, dtype=float).reshape(-1, grid.dimensions)
+        cells = []
+        for start, end in zip(points[:-1], points[1:]):
+            cells.extend(Raytracer(grid.dimensions, start, end).trace())
+
+        # Endpoint checks: the cells themselves in cell mode, the 2^D surrounding cells in vertex mode
+        for point in (points[0], points[-1]):
+            node = np.floor(point).astype(np.int64)
+            if mode == 'vertex':
+                corners = np.indices((2,) * grid.dimensions).reshape(grid.dimensions, -1).T
+                cells.extend(node - 1 + corners)
+            else:
+                cells.append(node)
+        return np.unique(np.array(cells, dtype=np.int64).reshape(-1, grid.dimensions), axis=0)
+
+    def _remove(self, key):
+        _, cells, nbytes = self.entries.pop(key)
+        self.resident_bytes -= nbytes
+        uid = key[-1]
+        for cell in map(tuple, cells.tolist()):
+            keys = self.cell_index.get((uid, cell))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cell_index[(uid, cell)]
+
+    def _on_cells_changed(self, grid, cells):
+        """Grid change listener: drop every entry that sweeps one of the changed cells."""
+        with self._lock:
+            for cell in map(tuple, np.asarray(cells).tolist()):
+                for key in list(self.cell_index.get((grid.uid, cell), ())):
+                    if key in self.entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self.entries.clear()
+            self.cell_index.clear()
+            self.resident_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        """Hit/miss/eviction/invalidation counters and current cache usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self.entries),
+                'resident_bytes': self.resident_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
@@ -5,6 +5,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.grid import Grid
 from utils.nodes import Nodes
+from utils.cartographer import Cartographer
+from utils.footprint import Footprint, inflate_occupancy
+from utils.results import PathResult
+
+SNAP_RADIUS = 32  # Largest snap distance (cells) on containers that are read box by box, not densified
 
 
 # Import algorithm classes
@@ -28,24 +33,67 @@ class PathPlanner:
     Modes:
     - 'cell': Planning from cell centers (coordinates are offset by 0.5)
     - 'vertex': Planning from vertex coordinates (integer coordinates)
+    
+    The occupancy grid may be a numpy array, an array-like container from utils, or a path
+    to an .npy file, which is memory-mapped and paged in chunk by chunk (see utils.paged).
+    An existing utils.grid.Grid is used as-is (origin, loose and storage are then ignored), so
+    its cached derived data is shared; algo.context.PlanningContext builds on this.
+    storage='packed' normalizes the grid once into a bit-packed layout (see utils.bitpacked),
+    storage='morton' into a cache-local Z-order layout (see utils.morton).
+    snap=True moves an occupied start/end cell to the nearest free cell instead of failing (at most
+    SNAP_RADIUS cells away on non-ndarray grids).
+    footprint (utils.footprint.Footprint) plans for a non-point robot on the inflated occupancy.
+    Start and end in different connected components are rejected without searching (see
+    Grid.are_connected) once the grid's component labels are built; check_connectivity=True builds
+    them on first use (worthwhile for a Grid shared by many queries, as in PlanningContext). Labels
+    are never built for non-ndarray grids. attempted_path=True searches anyway and returns the
+    path towards the explored node closest to the end.
+    cache (algo.path_cache.PathCache) answers repeated queries on the same Grid without searching;
+    it is ignored unless occupancy_grid is a Grid (footprint queries use its cached inflated Grid).
+    corridor=True first maps the straight line with the Cartographer and searches only the
+    traversed cells dilated by 1, 2, 4, ... cells, falling back to the full grid if no corridor
+    yields a path. The result is then the shortest path within the first corridor that has one.
+    compact=True returns a utils.results.PathResult (float32 points) instead of a list of tuples;
+    compact='expanded' also records the search's expanded nodes (int32).
+    should_stop is polled once per expansion; when it returns True the search is abandoned,
+    plan_path returns an empty path and self.stopped is set.
     """
-    def __init__(self, start_coords, end_coords, occupancy_grid, origin=None, loose=1, algorithm='bfs', mode='cell'):
+    def __init__(self, start_coords, end_coords, occupancy_grid, origin=None, loose=1, algorithm='bfs', mode='cell', storage=None, snap=False, footprint=None, attempted_path=False, cache=None, corridor=False, compact=False, should_stop=None, check_connectivity=False):
         # Store coordinates as grid indices (integers)
         self.start_coords = np.array(start_coords, dtype=int)
         self.end_coords = np.array(end_coords, dtype=int)
         self.algorithm = algorithm.lower()
         self.mode = mode.lower()
+        self.snap = snap
+        self.attempted_path = attempted_path
+        self.cache = cache
+        self.corridor = corridor
+        self.compact = compact
+        self.should_stop = should_stop
+        self.check_connectivity = check_connectivity
+        self.stopped = False
+        self._searched = False  # Whether the current plan_path call ran a search (for expanded nodes)
         
         if self.mode not in ['cell', 'vertex']:
             raise ValueError(f"Mode '{self.mode}' not supported. Use 'cell' or 'vertex'")
         
-        self.grid = Grid(occupancy_grid, loose=loose, origin=origin)
+        if isinstance(occupancy_grid, Grid):
+            self.grid = occupancy_grid
+        else:
+            self.grid = Grid(occupancy_grid, loose=loose, origin=origin, storage=storage)
+            if cache is not None:
+                # Entries are keyed by Grid uid, so a Grid built for this query alone could never be hit
+                print("Warning: cache needs a shared Grid (e.g. through PlanningContext), not caching this query")
+                self.cache = None
+        if footprint is not None:
+            self.grid = self.grid.inflated_grid(footprint)  # Plan the robot's reference point on inflated obstacles
         
         # Initialize nodes based on mode
         if self.mode == 'cell':
             self.nodes = Nodes(self.grid.num_cells)
         elif self.mode == 'vertex':
             self.nodes = Nodes(self.grid.num_vertices)
+        self.direction_table = None  # Search tables kept from the last run, reusable while occupancy is unchanged
         
 
         # Algorithm mapping
@@ -81,18 +129,19 @@ class PathPlanner:
         
         # Check occupancy based on mode
         if self.mode == 'cell':
-            # In cell mode, check if the cell itself is occupied
-            if self.grid.is_cell_occupied(self.start_coords):
+            # In cell mode, check if the cells themselves are occupied (both in one query)
+            start_occupied, end_occupied = self.grid.occupied_many([self.start_coords, self.end_coords])
+            if self.snap:
+                start_occupied = start_occupied and not self._snap_to_free_cell('start_coords')
+                end_occupied = end_occupied and not self._snap_to_free_cell('end_coords')
+            
+            if start_occupied:
                 print("Error: Start cell is occupied")
                 return False
             
-            if self.grid.is_cell_occupied(self.end_coords):
+            if end_occupied:
                 print("Error: End cell is occupied")
                 return False
-        elif self.mode == 'vertex':
-            # In vertex mode, we need to check if any adjacent cells are blocking
-            # For now, just check if coordinates are within bounds
-            pass
         
         # Check bounds based on mode
         if not self.grid.is_within_bounds_for_mode(self.start_coords, self.mode):
@@ -107,30 +156,155 @@ class PathPlanner:
             print(f"Error: End coordinates {self.end_coords} are out of {bounds_name} bounds {[f'[0, {b-1}]' for b in bounds]}")
             return False
         
+        # In vertex mode, a vertex whose surrounding cells are all occupied can never be entered or left
+        if self.mode == 'vertex':
+            if self.grid.is_vertex_enclosed(self.start_coords):
+                print("Error: Start vertex is enclosed by occupied cells")
+                return False
+            
+            if self.grid.is_vertex_enclosed(self.end_coords):
+                print("Error: End vertex is enclosed by occupied cells")
+                return False
+        
+        return True
+    
+    def _snap_to_free_cell(self, attribute):
+        """Replace an occupied start/end cell with the nearest free cell (via the distance transform on dense grids)."""
+        coords = getattr(self, attribute)
+        max_radius = None if isinstance(self.grid.occupancy_grid, np.ndarray) else SNAP_RADIUS
+        free_cell = self.grid.nearest_free_cell(coords, max_radius)
+        if free_cell is None:
+            return False
+        print(f"Snapped {attribute} {coords} to nearest free cell {free_cell}")
+        setattr(self, attribute, free_cell.astype(int))
         return True
     
     def plan_path(self):
+        self._searched = False
+        self.stopped = False
         # Validate inputs before planning
         if not self._validate_inputs():
             print("❌ Validation failed")
-            return []
+            return self._result([])
         
         print(f"Planning path using {self.algorithm.lower()} algorithm in {self.mode} mode...")
         print(f"Start: {self.start_coords}, End: {self.end_coords}")
         
-        # Execute the selected algorithm
-        algorithm_class = self.algorithms[self.algorithm]
-        algo = algorithm_class(self.grid, self.nodes, self.start_coords, self.end_coords, self.mode)
-        path = algo.run()
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.grid, self.start_coords, self.end_coords, self.mode, self.algorithm)
+            path = self.cache.get(cache_key)
+            if path is not None:
+                print(f"✅ Path found in cache! Length: {len(path)} cells")
+                return self._result(path)
+        
+        # Disconnected pairs are answered from the component labels unless the attempt is wanted
+        if not self.attempted_path and self._known_disconnected():
+            print("❌ No path found: start and end are in different connected components")
+            return self._result([])
+        
+        # Execute the selected algorithm, inside straight-line corridors first if requested
+        path = self._plan_in_corridors() if self.corridor else None
+        if path is None:
+            path = self._run_algorithm()
+        if path and not self.attempted_path and not self._is_complete(path):
+            path = []  # The search proved start and end disconnected; the attempt was not wanted
         
         if path:
             print(f"✅ Path found! Length: {len(path)} cells")
+            # Only complete paths are cached, attempted paths depend on the whole explored region
+            if self.cache is not None and self._is_complete(path):
+                self.cache.put(self.grid, cache_key, path)
         else:
             print("❌ No path found")
         
+        return self._result(path)
+    
+    def _known_disconnected(self):
+        """True if the component labels separate start and end; labels are only built when requested."""
+        if not isinstance(self.grid.occupancy_grid, np.ndarray):
+            return False  # Sparse and out-of-core containers are never densified for labels
+        if not (self.check_connectivity or self.grid.has_component_labels(self.mode)):
+            return False  # Labeling the whole grid costs more than a short search
+        return not self.grid.are_connected(self.start_coords, self.end_coords, self.mode)
+    
+    def _result(self, path):
+        """The path as returned to the caller: unchanged, or a PathResult with compact=True."""
+        if not self.compact:
+            return path
+        expanded = None
+        if self.compact == 'expanded' and self._searched:
+            expanded = [coords for coords, node in self.nodes.nodes.items() if node.expanded]
+        return PathResult.from_path(path, self.grid.dimensions, expanded, self._is_complete(path))
+
+    
+    def _run_algorithm(self, allowed=None):
+        self._searched = True
+        self.nodes.reset()
+        algorithm_class = self.algorithms[self.algorithm]
+        algo = algorithm_class(self.grid, self.nodes, self.start_coords, self.end_coords, self.mode,
+                               direction_table=self.direction_table, allowed=allowed, should_stop=self.should_stop)
+        self.direction_table = algo.direction_table
+        path = algo.run()
+        self.stopped = self.stopped or algo.stopped
         return path
+    
+    def _is_complete(self, path):
+        """True if the path ends at the end node (not an attempted path)."""
+        return bool(path) and np.array_equal(np.floor(path[-1]).astype(int), self.end_coords)
+    
+    def _plan_in_corridors(self):
+        """Search dilations of the Cartographer's straight-line corridor; None if none yields a path."""
+        if np.array_equal(self.start_coords, self.end_coords):
+            return None  # Nothing to map, the search returns immediately
+        offset = 0.0 if self.mode == 'vertex' else 0.5
+        # Share the Grid (and its free-box acceptance) only when it is dense; other containers are read cell by cell
+        grid = self.grid if isinstance(self.grid.occupancy_grid, np.ndarray) else None
+        cartographer = Cartographer(self.grid.dimensions, self.start_coords + offset, self.end_coords + offset,
+                                    self.grid.occupancy_grid, self.grid.origin, self.grid.loose, grid=grid)
+        result = cartographer.map(compact=True)
+        if not result.success:
+            print("Straight-line corridor is blocked, searching the full grid")
+            return None
+        
+        # Corridor cells in array order, clipped to the grid
+        cells = result.traversed_front_cells.astype(np.int64)
+        cells = cells[np.all((cells >= 0) & (cells < self.grid.num_cells), axis=1)][:, ::-1]
+        if not len(cells):
+            return None
+        
+        radius = 1
+        while radius < np.max(self.grid.num_cells):
+            # Dilate only within the corridor's bounding box grown by the radius, never the whole grid
+            lo = np.maximum(cells.min(axis=0) - radius, 0)
+            hi = np.minimum(cells.max(axis=0) + radius + 1, self.grid.num_cells[::-1])
+            box = np.zeros(hi - lo, dtype=bool)
+            box[tuple((cells - lo).T)] = True
+            allowed = inflate_occupancy(box, Footprint(radius))
+            if self.mode == 'vertex':
+                allowed = self._vertices_of_cells(allowed)  # Vertex lo + i touches cells lo + i - 1 and lo + i
+            path = self._run_algorithm((lo, allowed))
+            if self.stopped:
+                return path
+            if self._is_complete(path):
+                print(f"Path found within a corridor of radius {radius}")
+                return path
+            radius *= 2
+        print("No corridor yields a path, searching the full grid")
+        return None
+    
+    @staticmethod
+    def _vertices_of_cells(cells):
+        """Vertices touching any True cell: a pairwise max-reduction along each axis of the padded mask."""
+        vertices = np.pad(cells, 1, mode='constant', constant_values=False)
+        for axis in range(vertices.ndim):
+            lower = [slice(None)] * vertices.ndim
+            upper = [slice(None)] * vertices.ndim
+            lower[axis] = slice(0, -1)
+            upper[axis] = slice(1, None)
+            vertices = vertices[tuple(lower)] | vertices[tuple(upper)]
+        return vertices
 
 
-def plan_path(start_coords, end_coords, occupancy_grid, origin=None, loose=1, algorithm='bfs', mode='cell'):
-    planner = PathPlanner(start_coords, end_coords, occupancy_grid, origin, loose, algorithm, mode)
+def plan_path(start_coords, end_coords, occupancy_grid, origin=None, loose=1, algorithm='bfs', mode='cell', storage=None, snap=False, footprint=None, attempted_path=False, cache=None, corridor=False, compact=False, should_stop=None, check_connectivity=False):
+    planner = PathPlanner(start_coords, end_coords, occupancy_grid, origin, loose, algorithm, mode, storage, snap, footprint, attempted_path, cache, corridor, compact, should_stop, check_connectivity)
     return planner.plan_path()
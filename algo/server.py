@@ -0,0 +1,217 @@
+import numpy as np
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import stat
+import threading
+import socketserver
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.grid import Grid
+from utils.raytracer import Raytracer
+from utils.cartographer import Cartographer
+
+from .context import PlanningContext
+
+"""
+Long-running local planning daemon speaking JSON lines (one request object per line, one
+response object per line, in order).
+
+Grids are loaded once under a name and stay warm: the Grid and its lazily built tables
+(padded occupancy, edge words, distance transform) and one PlanningContext per
+(grid, mode, algorithm) are kept between requests, and occupancy patches update them
+incrementally through Grid.update_cells. Clients therefore pay only for the query itself.
+Plans never build component labels (check_connectivity=False): every patch drops them, and
+relabelling the whole grid on the next plan would cost far more than the query.
+
+Requests: {"id": any, "op": ..., ...}
+- load:  name, occupancy (nested lists, array order) or path (.npy file, read into memory), loose=1,
+         origin=None
+- patch: name, cells ([[x, y, ...], ...] world coordinates), occupied=true (bool or list)
+- plan:  name, start, goal, mode='cell', algorithm='bfs', attempted_path=false, timeout=None (s);
+         a start or goal out of bounds, occupied (cell mode) or enclosed (vertex mode) is an error
+- trace: start, end, name=None (with a grid, also reports whether the segment is free)
+- map:   name, start, end (Cartographer over the grid)
+- batch: requests (list of requests, answered in order)
+- grids: loaded grids; drop: name
+Responses: {"id", "ok", "result" or "error", "latency_ms"}.
+
+Run with 'python -m algo.server' to serve stdin/stdout, or with '--socket PATH' to serve a Unix
+socket (one thread per connection, requests are answered one at a time). Planner logs would
+corrupt the protocol on stdout, so they are discarded (or sent to stderr with --log).
+"""
+class PlanningServer:
+    def __init__(self):
+        self.grids = {}       # name -> Grid
+        self._contexts = {}   # (name, mode, algorithm) -> PlanningContext
+        self._lock = threading.RLock()  # Requests share the warm state, so they are answered one at a time
+        self.handlers = {
+            'load': self._load,
+            'patch': self._patch,
+            'plan': self._plan,
+            'trace': self._trace,
+            'map': self._map,
+            'batch': self._batch,
+            'grids': self._list_grids,
+            'drop': self._drop,
+        }
+
+    def handle(self, request):
+        """Answer one request dict; every failure is reported in the response, never raised."""
+        started = time.perf_counter()
+        response = {'id': request.get('id') if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            op = request.get('op')
+            if op not in self.handlers:
+                raise ValueError(f"op '{op}' not supported. Choose from: {list(self.handlers.keys())}")
+            with self._lock:
+                response['result'] = self.handlers[op](request)
+            response['ok'] = True
+        except Exception as e:
+            response['ok'] = False
+            response['error'] = f"{type(e).__name__}: {e}"
+        response['latency_ms'] = (time.perf_counter() - started) * 1000
+        return response
+
+    def handle_line(self, line):
+        """Answer one JSON line; returns the response line (without newline)."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return json.dumps({'id': None, 'ok': False, 'error': f"Invalid JSON: {e}", 'latency_ms': 0.0})
+        return json.dumps(self.handle(request))
+
+    def serve(self, lines, write):
+        """Answer every non-empty line, writing each response line as soon as it is ready."""
+        for line in lines:
+            if line.strip():
+                write(self.handle_line(line) + '\n')
+
+    def _grid(self, request):
+        name = request.get('name')
+        if name not in self.grids:
+            raise KeyError(f"No grid named '{name}' is loaded")
+        return self.grids[name]
+
+    def _load(self, request):
+        name = request['name']
+        if 'path' in request:
+            occupancy = np.load(request['path'])  # Read into memory, so patches apply in place
+        else:
+            occupancy = request['occupancy']
+        occupancy = (np.asarray(occupancy) != 0).astype(np.uint8)  # Any nonzero value is occupied, as in Grid
+        grid = Grid(occupancy, loose=request.get('loose', 1), origin=request.get('origin'))
+        self._drop({'name': name})
+        self.grids[name] = grid
+        return {'name': name, 'shape': list(grid.occupancy_grid.shape), 'dimensions': grid.dimensions}
+
+    def _patch(self, request):
+        grid = self._grid(request)
+        occupied = request.get('occupied', True)
+        grid.update_cells(np.array(request['cells'], dtype=np.int64), np.array(occupied, dtype=bool))
+        return {'version': grid.version}
+
+    def _plan(self, request):
+        grid = self._grid(request)
+        mode = request.get('mode', 'cell').lower()
+        algorithm = request.get('algorithm', 'bfs').lower()
+        key = (request['name'], mode, algorithm)
+        if key not in self._contexts:
+            self._contexts[key] = PlanningContext(grid, mode=mode, algorithm=algorithm, compact=True, check_connectivity=False)
+        context = self._contexts[key]
+        for name in ('start', 'goal'):
+            self._check_node(grid, name, request[name], context.mode)
+
+        should_stop = None
+        if request.get('timeout') is not None:
+            deadline = time.monotonic() + float(request['timeout'])
+            should_stop = lambda: time.monotonic() > deadline
+        path = context.plan(request['start'], request['goal'], request.get('attempted_path', False), should_stop)
+        return {'path': path.points.tolist(), 'complete': path.complete, 'stopped': context.stopped}
+
+    @staticmethod
+    def _check_node(grid, name, coords, mode):
+        """Reject a start/goal the planner could not search from (it would only log why and return no path)."""
+        coords = np.asarray(coords)
+        if coords.shape != (grid.dimensions,) or not np.issubdtype(coords.dtype, np.integer):
+            raise ValueError(f"{name} must be {grid.dimensions} integer coordinates, got {coords.tolist()}")
+        bounds = grid.num_cells if mode == 'cell' else grid.num_vertices
+        if np.any(coords < 0) or np.any(coords >= bounds):
+            raise ValueError(f"{name} {coords.tolist()} is out of {mode} bounds {[[0, int(b) - 1] for b in bounds]}")
+        if mode == 'cell' and grid.occupied_many([coords])[0]:
+            raise ValueError(f"{name} cell {coords.tolist()} is occupied")
+        if mode == 'vertex' and grid.is_vertex_enclosed(coords):
+            raise ValueError(f"{name} vertex {coords.tolist()} is enclosed by occupied cells")
+    
+    def _trace(self, request):
+        start = np.array(request['start'], dtype=float)
+        end = np.array(request['end'], dtype=float)
+        cells = Raytracer(len(start), start, end).trace()
+        result = {'cells': np.array(cells, dtype=np.int64).reshape(-1, len(start)).tolist()}
+        if request.get('name') is not None:
+            result['free'] = bool(self._grid(request).segment_is_free(start, end))
+        return result
+
+    def _map(self, request):
+        grid = self._grid(request)
+        cartographer = Cartographer(grid.dimensions, request['start'], request['end'], None, None, grid.loose, grid=grid)
+        result = cartographer.map(compact=True)
+        return {'success': result.success, 'cells': result.traversed_front_cells.tolist(), 'error': result.error}
+
+    def _batch(self, request):
+        return [self.handle(sub_request) for sub_request in request['requests']]
+
+    def _list_grids(self, request):
+        return {name: {'shape': list(grid.occupancy_grid.shape), 'version': grid.version} for name, grid in self.grids.items()}
+
+    def _drop(self, request):
+        name = request['name']
+        self._contexts = {key: context for key, context in self._contexts.items() if key[0] != name}
+        return {'dropped': self.grids.pop(name, None) is not None}
+
+
+def serve_unix(server, path):
+    """Serve JSON lines on a Unix socket until interrupted."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode('utf-8') for line in self.rfile)
+            def write(text):
+                self.wfile.write(text.encode('utf-8'))
+                self.wfile.flush()
+            server.serve(lines, write)
+
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise FileExistsError(f"{path} exists and is not a socket")
+        os.remove(path)  # Stale socket from an earlier run
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+        unix_server.daemon_threads = True
+        try:
+            unix_server.serve_forever()
+        finally:
+            os.remove(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm planning daemon speaking JSON lines")
+    parser.add_argument('--socket', help="Unix socket path (default: serve stdin/stdout)")
+    parser.add_argument('--log', action='store_true', help="Send planner logs to stderr instead of discarding them")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    sys.stdout = sys.stderr if args.log else open(os.devnull, 'w')  # Keep planner prints off the protocol stream
+    server = PlanningServer()
+    if args.socket:
+        serve_unix(server, args.socket)
+    else:
+        def write(text):
+            out.write(text)
+            out.flush()
+        server.serve(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), write)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import numpy as np
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.grid import Grid
+
+from .context import PlanningContext
+
+"""
+Planning on one map from many threads at once.
+
+The map is split into an immutable snapshot and per-query scratch state:
+- grid is the current snapshot, a Grid that is never modified once published. update_cells builds
+  the next snapshot with Grid.updated (copy-on-write) and swaps it in with one assignment, so a
+  query reads a single consistent occupancy from start to end, even while an update is running.
+  Updates are serialized with a lock; queries never take it.
+- every thread plans through its own PlanningContext (Nodes store, search tables, planner), kept
+  in thread-local storage and rebuilt when the thread first sees a new snapshot.
+Lazy caches of a snapshot (component labels, edge words, ...) are built under the Grid's own
+lock, so concurrent first queries build each of them once. Searches spend much of their time in
+NumPy kernels that release the GIL, which lets a thread pool (plan_many) overlap them.
+
+Every snapshot starts without component labels, so with check_connectivity=True the first query
+after each update_cells relabels the whole grid (hundreds of milliseconds on a 160^3 grid).
+Frequently updated maps should pass check_connectivity=False.
+"""
+class SharedPlanner:
+    def __init__(self, occupancy_grid, loose=1, mode='cell', origin=None, algorithm='bfs', compact=False, check_connectivity=True):
+        if isinstance(occupancy_grid, Grid):
+            self.grid = occupancy_grid  # Treated as immutable from now on
+        else:
+            self.grid = Grid(np.array(occupancy_grid), loose=loose, origin=origin)  # Private copy
+        if not isinstance(self.grid.occupancy_grid, np.ndarray):
+            raise ValueError("SharedPlanner needs a dense ndarray occupancy grid")
+        self.mode = mode.lower()
+        self.algorithm = algorithm.lower()
+        self.compact = compact
+        self.check_connectivity = check_connectivity
+        if self.mode not in ['cell', 'vertex']:
+            raise ValueError(f"Mode '{self.mode}' not supported. Use 'cell' or 'vertex'")
+
+        self._update_lock = threading.Lock()
+        self._local = threading.local()  # Per-thread PlanningContext and the snapshot it was built for
+
+    def _context(self, grid):
+        """This thread's PlanningContext for the snapshot."""
+        context = getattr(self._local, 'context', None)
+        if context is None or context.grid is not grid:
+            context = PlanningContext(grid, mode=self.mode, algorithm=self.algorithm, compact=self.compact,
+                                      check_connectivity=self.check_connectivity)
+            self._local.context = context
+        return context
+
+    def plan(self, start_coords, goal_coords, attempted_path=False, should_stop=None):
+        """Plan one path on the current snapshot (see PathPlanner.plan_path); safe to call from any thread."""
+        grid = self.grid  # One read: the whole query sees this snapshot
+        return self._context(grid).plan(start_coords, goal_coords, attempted_path, should_stop)
+
+    def is_connected(self, start_coords, goal_coords):
+        return self.grid.are_connected(start_coords, goal_coords, self.mode)
+
+    def update_cells(self, cell_coords, occupied=True):
+        """Publish a new snapshot with the cells changed; queries already running keep the old one."""
+        with self._update_lock:
+            self.grid = self.grid.updated(cell_coords, occupied)
+
+    def plan_many(self, pairs, workers=None):
+        """Plan every (start, goal) pair on a thread pool; results in input order."""
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda pair: self.plan(*pair), pairs))
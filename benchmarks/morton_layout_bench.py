@@ -0,0 +1,77 @@
+import time
+import numpy as np
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.morton import MortonGrid
+from utils.raytracer import Raytracer
+
+def _best_time(fn, repeats):
+    """Best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _neighborhood_indices(centers, shape):
+    """Array-order indices of the full 3^D neighborhood around each center, flattened."""
+    dimensions = len(shape)
+    offsets = np.indices((3,) * dimensions).reshape(dimensions, -1).T - 1
+    cells = centers[:, None, :] + offsets[None, :, :]
+    return tuple(cells.reshape(-1, dimensions).T)
+
+def _ray_indices(shape, num_rays, ray_length, rng):
+    """Array-order indices of all cells crossed by short random rays."""
+    dimensions = len(shape)
+    upper = np.array(shape[::-1], dtype=float)  # Raytracer works in coordinate order
+    cells = []
+    for _ in range(num_rays):
+        start = rng.uniform(ray_length, upper - ray_length)
+        direction = rng.normal(size=dimensions)
+        end = start + ray_length * direction / np.linalg.norm(direction)
+        cells.extend(Raytracer(dimensions, start, end).trace())
+    cells = np.array(cells, dtype=np.int64)[:, ::-1]  # Back to array order
+    return tuple(cells.T)
+
+def benchmark_layouts(shape, num_centers=20000, num_rays=300, ray_length=6.0, repeats=5, seed=0):
+    """Compare row-major and Morton gathers for 3^D neighborhoods and short rays."""
+    rng = np.random.default_rng(seed)
+    occupancy = rng.random(shape) < 0.2
+    morton = MortonGrid(occupancy)
+
+    centers = np.stack([rng.integers(1, s - 1, size=num_centers) for s in shape], axis=1)
+    workloads = {
+        '3^D neighborhoods': _neighborhood_indices(centers, shape),
+        'short rays': _ray_indices(shape, num_rays, ray_length, rng),
+    }
+
+    print(f"\n=== Grid shape {shape} ({occupancy.nbytes / 1e6:.1f} MB row-major, {morton.nbytes / 1e6:.1f} MB Morton) ===")
+    for name, indices in workloads.items():
+        # Precompute addresses so only the memory access pattern is timed
+        row_major_flat = np.ravel_multi_index(indices, shape)
+        morton_codes = morton.layout.encode(indices)
+        row_major_cells = occupancy.ravel()
+
+        assert np.array_equal(row_major_cells[row_major_flat], morton.gather(morton_codes))
+
+        row_major_time = _best_time(lambda: row_major_cells[row_major_flat], repeats)
+        morton_time = _best_time(lambda: morton.gather(morton_codes), repeats)
+
+        # Distinct 64-byte lines touched by the whole workload, a proxy for cache traffic
+        row_major_lines = len(np.unique(row_major_flat // 64))
+        morton_lines = len(np.unique(morton_codes // 64))
+
+        print(f"{name:>18}: {len(row_major_flat):8d} lookups | "
+              f"row-major {row_major_time * 1e3:7.2f} ms, {row_major_lines:7d} lines | "
+              f"Morton {morton_time * 1e3:7.2f} ms, {morton_lines:7d} lines")
+
+def run_benchmarks():
+    benchmark_layouts((256, 256, 256))
+    benchmark_layouts((32, 32, 32, 32))
+
+if __name__ == "__main__":
+    run_benchmarks()
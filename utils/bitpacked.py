@@ -0,0 +1,79 @@
+import numpy as np
+
+"""
+Bit-packed occupancy storage.
+
+The occupancy grid is normalized once into one bit per cell (C order, most significant bit
+first within each byte) held in a contiguous uint8 buffer. Compared to the int64/bool arrays
+callers usually pass, this is 64x/8x smaller, so much larger maps stay in cache and in RAM.
+
+The container is array-like (shape in array order, tuple indexing with scalars or integer
+arrays) so Grid and Cartographer can use it in place of the dense array. The flat-index
+helpers 'get' and 'gather' are exposed for callers that already work with flat indices.
+"""
+class BitPackedGrid:
+    def __init__(self, occupancy_grid):
+        occupancy = np.asarray(occupancy_grid) != 0
+        self.shape = occupancy.shape
+        self.ndim = occupancy.ndim
+        self.size = occupancy.size
+
+        # Element strides of the C-ordered flat index, one per array axis
+        self.strides = np.array([int(np.prod(self.shape[axis + 1:])) for axis in range(self.ndim)], dtype=np.int64)
+        self._strides = [int(s) for s in self.strides]  # Python ints for the scalar fast path
+
+        self.bits = np.ascontiguousarray(np.packbits(occupancy.ravel()))
+
+    def flat_index(self, array_indices):
+        """C-ordered flat index for a tuple of (scalar or array) indices in array order."""
+        return np.ravel_multi_index(tuple(np.asarray(i, dtype=np.int64) for i in array_indices), self.shape)
+
+    def get(self, flat):
+        """Occupancy of a single cell given its flat index."""
+        return bool((self.bits[flat >> 3] >> (7 - (flat & 7))) & 1)
+
+    def gather(self, flat):
+        """Vectorized occupancy of many cells given an array of flat indices."""
+        flat = np.asarray(flat, dtype=np.int64)
+        return ((self.bits[flat >> 3] >> (7 - (flat & 7)).astype(np.uint8)) & 1).astype(bool)
+
+    def __getitem__(self, array_indices):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        if len(array_indices) != self.ndim:
+            raise IndexError(f"expected {self.ndim} indices, got {len(array_indices)}")
+
+        if all(isinstance(i, (int, np.integer)) for i in array_indices):
+            # Scalar fast path without building index arrays
+            flat = 0
+            for axis, i in enumerate(array_indices):
+                i = int(i)
+                if i < 0 or i >= self.shape[axis]:
+                    raise IndexError(f"index {i} is out of bounds for axis {axis} with size {self.shape[axis]}")
+                flat += i * self._strides[axis]
+            return self.get(flat)
+
+        return self.gather(self.flat_index(array_indices))
+
+    def __setitem__(self, array_indices, occupied):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        flat = np.atleast_1d(self.flat_index(array_indices)).ravel()
+        occupied = np.broadcast_to(np.asarray(occupied) != 0, flat.shape)
+        masks = (1 << (7 - (flat & 7))).astype(np.uint8)
+        bytes_at = flat >> 3
+        # Clear every addressed bit, then set the occupied ones (a repeated index ends up set if any write sets it)
+        np.bitwise_and.at(self.bits, bytes_at, ~masks)
+        np.bitwise_or.at(self.bits, bytes_at[occupied], masks[occupied])
+
+    def to_array(self):
+        """Unpack into a dense boolean array."""
+        return np.unpackbits(self.bits, count=self.size).astype(bool).reshape(self.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        occupancy = self.to_array()
+        return occupancy if dtype is None else occupancy.astype(dtype)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
@@ -1,22 +1,81 @@
 import sys
 import os
-import itertools
 import numpy as np
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.raytracer import Raytracer
+from utils.grid import Grid, STORAGE_BACKENDS
+from utils.directions import flat_direction_offsets
+from utils.results import CartographerResult
+
+@lru_cache(maxsize=65536)
+def _box_reachability(padded_shape, loose, accessible_bits, seed_bits):
+    """
+    Cells reached from the seeds through accessible cells of a bounding box padded by one
+    inaccessible layer (flat, array order, read-only). Each step expands the whole frontier by
+    every direction's flat offset at once; the border makes bounds checks unnecessary.
+    Masks are passed bit-packed so that identical local patterns share one memoized result.
+    """
+    size = int(np.prod(padded_shape))
+    accessible = np.unpackbits(np.frombuffer(accessible_bits, dtype=np.uint8), count=size).astype(bool)
+    reached = np.unpackbits(np.frombuffer(seed_bits, dtype=np.uint8), count=size).astype(bool)
+    offsets = flat_direction_offsets(len(padded_shape), loose, padded_shape)
+
+    frontier = np.flatnonzero(reached)
+    while len(frontier):
+        candidates = (frontier[:, None] + offsets[None, :]).ravel()
+        candidates = np.unique(candidates[accessible[candidates] & ~reached[candidates]])
+        reached[candidates] = True
+        frontier = candidates
+    reached.flags.writeable = False
+    return reached
+
+def gather_accessible(occupancy_grid, origin, cells):
+    """Accessibility (in bounds and unoccupied) of an (N, D) array of world cells, in one gather."""
+    indices = np.asarray(cells, dtype=int).reshape(-1, len(origin)) - origin
+    grid_shape_rev = np.array(occupancy_grid.shape[::-1])
+    
+    # Cells outside the grid are not accessible
+    in_bounds = np.all((indices >= 0) & (indices < grid_shape_rev), axis=1)
+    accessible = np.zeros(len(indices), dtype=bool)
+    
+    # Single gather over all in-bounds cells
+    inside = indices[in_bounds]
+    accessible[in_bounds] = np.asarray(occupancy_grid[tuple(inside[:, ::-1].T)]) == 0
+    return accessible
 
 class Cartographer():
-    def __init__(self, dimensions, start_coords, end_coords, occupancy_grid, origin, loose):
+    def __init__(self, dimensions, start_coords, end_coords, occupancy_grid, origin, loose, storage=None, grid=None, accessibility=None):
         self.all_traversed_front_cells = set()  # Store front cells discovered by the raytracer (no duplicates)
+        self.accessibility = accessibility      # Optional AccessibilityCache shared with other Cartographers
+        self.error = None                       # Why the last iter_fronts() stopped early, if it did
+        
+        # Optional shared Grid over the same occupancy; enables O(1) free-box acceptance when it has a
+        # summed-area table (dense grids only, other containers are read cell by cell as without one)
+        self.grid = grid
+        self.box_queries = grid is not None and grid.supports_box_queries()
+        if grid is not None:
+            if occupancy_grid is None:
+                occupancy_grid = grid.occupancy_grid
+            if origin is None:
+                origin = grid.origin
 
         self.raytracer = Raytracer(dimensions, start_coords, end_coords)
 
+        if storage is not None:
+            if storage not in STORAGE_BACKENDS:
+                raise ValueError(f"storage '{storage}' not supported. Choose from: {list(STORAGE_BACKENDS.keys())}")
+            occupancy_grid = STORAGE_BACKENDS[storage](occupancy_grid)
+
         self.occupancy_grid = occupancy_grid
         self.loose = loose
         self.dimensions = dimensions
         
-        # Set grid origin coordinates (defaults to zero origin)
+        # Set grid origin coordinates (defaults to the container's own origin, else zero)
+        if origin is None:
+            origin = getattr(occupancy_grid, 'origin', None)
         if origin is None:
             self.origin = np.zeros(self.dimensions, dtype=int)
         else:
@@ -24,28 +83,74 @@ class Cartographer():
             if len(self.origin) != self.dimensions:
                 raise ValueError(f"origin must have {self.dimensions} coordinates, got {len(self.origin)}")
 
-    def map(self):
+    def map(self, compact=False):
+        """
+        Map the ray front by front. Returns the result dict, or with compact=True a
+        utils.results.CartographerResult backed by an int32 cell array (no per-cell tuples).
+        """
+        if compact:
+            fronts = [cells for _, cells in self.iter_fronts()]
+            cells = np.unique(np.concatenate(fronts), axis=0) if fronts else np.empty((0, self.dimensions), dtype=int)
+            print(f"Raytracing {'completed' if self.error is None else 'stopped'}. Total traversed front cells: {len(cells)}")
+            return CartographerResult(self.error is None, cells, self._raytracer_position(), self.error)
+        
+        for _, cells in self.iter_fronts():
+            self.all_traversed_front_cells.update(map(tuple, cells.tolist()))
+        
+        if self.error is not None:
+            return self._handle_raytracing_failure(self.error)
+        
+        print(f"Raytracing completed. Total traversed front cells: {len(self.all_traversed_front_cells)}")
+        # Return success result with traversed cells
+        return {
+            'success': True,
+            'traversed_front_cells': list(self.all_traversed_front_cells),
+            'raytracer_position': self._raytracer_position()
+        }
+    
+    def _raytracer_position(self):
+        return {
+            'current_coords': self.raytracer.coords().tolist(),
+            'parametric_position': self.raytracer.t,
+            'reached_goal': self.raytracer.reached()
+        }
+    
+    def iter_fronts(self):
+        """
+        Yield (t, cells) for each reachable front along the ray, where t is the raytracer's
+        parametric position and cells a (K, D) int array. Nothing is accumulated, so memory stays
+        constant however long the ray is, and the consumer may stop at any front. When the ray is
+        blocked the generator stops early and self.error holds the reason (None otherwise).
+        """
+        self.error = None
+        
+        # Early acceptance: if the ray's whole bounding box is free, every front is accessible and reachable
+        if self.box_queries and self._ray_box_is_free():
+            while not self.raytracer.reached():
+                yield self.raytracer.t, np.array(self.raytracer.front_cells(), dtype=int).reshape(-1, self.dimensions)
+                if not self.raytracer.next():
+                    break
+            return
+        
         previous_cells = None  # Track previous front cells
         
         while not self.raytracer.reached():
             # Get accessible front cells at current position
-            current_cells = set()
-            for cell in self.raytracer.front_cells():
-                cell_tuple = tuple(cell)
-                if self.is_accessible(cell_tuple):
-                    current_cells.add(cell_tuple)
+            current_cells = self._accessible_front_cells()
 
             # Check if we have any accessible front cells
             if not current_cells:
-                return self._handle_raytracing_failure("No accessible front cells found.")
+                self.error = "No accessible front cells found."
+                return
             
             # Filter current cells to only include those reachable from the previous front
             if previous_cells:
                 current_cells = self._get_reachable_front_cells(previous_cells, current_cells)
                 if not current_cells:
-                    return self._handle_raytracing_failure("Current front is not reachable from the previous front.")
+                    self.error = "Current front is not reachable from the previous front."
+                    return
 
-            self.all_traversed_front_cells.update(current_cells)
+            yield self.raytracer.t, np.array(list(current_cells), dtype=int).reshape(-1, self.dimensions)
             
             # Move to next grid crossing
             if not self.raytracer.next():
@@ -56,81 +161,78 @@ class Cartographer():
         
         # Only process final cells if we haven't already reached the goal during the loop
         if not self.raytracer.reached():
-            # Handle final cells at the goal position
             # Handle final accessible cells at the goal position
-            final_cells = set()
-            for cell in self.raytracer.front_cells():
-                cell_tuple = tuple(cell)
-                if self.is_accessible(cell_tuple):
-                    final_cells.add(cell_tuple)
+            final_cells = self._accessible_front_cells()
 
             # Check if we have any final cells
             if not final_cells:
-                return self._handle_raytracing_failure("No accessible final front cells found.")
+                self.error = "No accessible final front cells found."
+                return
 
             # Check reachability from the last set of front cells
             if previous_cells:
                 final_cells = self._get_reachable_front_cells(previous_cells, final_cells)
                 if not final_cells:
-                    return self._handle_raytracing_failure("Final front is not reachable from the previous front.")
+                    self.error = "Final front is not reachable from the previous front."
+                    return
             
-            self.all_traversed_front_cells.update(final_cells)
-        
-        print(f"Raytracing completed. Total traversed front cells: {self.all_traversed_front_cells}")
-        # Return success result with traversed cells
-        return {
-            'success': True,
-            'traversed_front_cells': list(self.all_traversed_front_cells),
-            'raytracer_position': {
-                'current_coords': self.raytracer.coords().tolist(),
-                'parametric_position': self.raytracer.t,
-                'reached_goal': self.raytracer.reached()
-            }
-        }    
+            yield self.raytracer.t, np.array(list(final_cells), dtype=int).reshape(-1, self.dimensions)
+    
+    def _ray_box_is_free(self):
+        # Front cells are y + f with f in {-1, 0}, so they stay within [floor(min) - 1, ceil(max)]
+        low = np.minimum(self.raytracer.start_coords, self.raytracer.end_coords)
+        high = np.maximum(self.raytracer.start_coords, self.raytracer.end_coords)
+        return self.grid.is_box_free(np.floor(low).astype(int) - 1, np.ceil(high).astype(int))
     
     def _handle_raytracing_failure(self, error_message):
         return {
             'success': False,
             'error': error_message,
             'traversed_front_cells': list(self.all_traversed_front_cells),
-            'raytracer_position': {
-                'current_coords': self.raytracer.coords().tolist(),
-                'parametric_position': self.raytracer.t,
-                'reached_goal': self.raytracer.reached()
-            }
+            'raytracer_position': self._raytracer_position()
         }
 
     def _get_reachable_front_cells(self, previous_cells, current_cells):
         """
         Finds all cells in current_cells that are reachable from any cell in previous_cells
-        using BFS within the combined bounding box. The path cannot go through other
-        current_cells, only through accessible cells.
+        within the combined bounding box, stepping between accessible cells under the 'loose'
+        limit, via a flood fill over a boolean mask of the box (see _box_reachability).
         """
+        previous = np.array(list(previous_cells), dtype=int).reshape(-1, self.dimensions)
+        current_list = list(current_cells)
+        current = np.array(current_list, dtype=int).reshape(-1, self.dimensions)
+
         # Bounding box for the search
-        dimensions = self.raytracer.dimensions
-        all_cells_for_bbox = previous_cells.union(current_cells)
-        min_coords = tuple(min(c[i] for c in all_cells_for_bbox) for i in range(dimensions))
-        max_coords = tuple(max(c[i] for c in all_cells_for_bbox) for i in range(dimensions))
-
-        # BFS implementation
-        queue = list(previous_cells)
-        visited = set(previous_cells)
-        reachable_current_cells = set()
-
-        while queue:
-            cell = queue.pop(0)
-
-            # Get neighbors based on 'loose' and bounding box
-            for neighbor in self._get_neighbors(cell, min_coords, max_coords):
-                if neighbor not in visited:
-                    if neighbor in current_cells:
-                        visited.add(neighbor)
-                        reachable_current_cells.add(neighbor)
-                        queue.append(neighbor)
-
-                    elif self.is_accessible(neighbor):
-                        visited.add(neighbor)
-                        queue.append(neighbor)
+        all_cells = np.concatenate([previous, current])
+        min_coords = all_cells.min(axis=0)
+        max_coords = all_cells.max(axis=0)
+
+        # Early acceptance: a fully free box is connected, so every current cell is reachable
+        if self.box_queries and self.grid.is_box_free(min_coords, max_coords):
+            return current_cells - previous_cells
+
+        # Box masks in array order, padded by one inaccessible layer so no step needs bounds checks
+        box_shape = tuple(int(n) for n in (max_coords - min_coords + 1)[::-1])
+        padded_shape = tuple(n + 2 for n in box_shape)
+        box_cells = np.indices(box_shape).reshape(self.dimensions, -1).T[:, ::-1] + min_coords
+        accessible = np.zeros(padded_shape, dtype=bool)
+        accessible[(slice(1, -1),) * self.dimensions] = self.accessible_many(box_cells).reshape(box_shape)
+
+        def flat(cells):
+            return np.ravel_multi_index(tuple((cells - min_coords + 1)[:, ::-1].T), padded_shape)
+
+        accessible = accessible.ravel()
+        current_flat = flat(current)
+        accessible[current_flat] = True
+        seeds = np.zeros(accessible.shape, dtype=bool)
+        seeds[flat(previous)] = True  # Seeds are kept even if they are not accessible
+
+        # Consecutive fronts span at most a few cells per axis, so the same local patterns recur
+        # along a ray and across rays; the fill is memoized per (box, loose, accessibility, seeds)
+        reached = _box_reachability(padded_shape, self.loose, np.packbits(accessible).tobytes(), np.packbits(seeds).tobytes())
+
+        hits = reached[current_flat]
+        reachable_current_cells = {cell for cell, hit in zip(current_list, hits) if hit} - previous_cells
         print(f"Reachable current cells: {reachable_current_cells} from previous cells: {previous_cells}")
         return reachable_current_cells
     
@@ -148,26 +250,113 @@ class Cartographer():
         # Check the occupancy status of the cell and return true if not occupied
         return self.occupancy_grid[tuple(indices[::-1])] == 0
     
-    def _get_neighbors(self, cell, min_coords, max_coords):
-        neighbors = []
-        dimensions = len(cell)
+    def accessible_many(self, cells):
+        """Vectorized is_accessible for an (N, D) array of cells; returns a bool array."""
+        cells = np.asarray(cells, dtype=int).reshape(-1, self.dimensions)
+        if self.accessibility is not None:
+            return self.accessibility.lookup(cells)
+        return gather_accessible(self.occupancy_grid, self.origin, cells)
+    
+    def _accessible_front_cells(self):
+        """Accessible cells of the raytracer's current front, checked in one batch."""
+        front_cells = self.raytracer.front_cells()
+        if not front_cells:
+            return set()
+        front_cells = np.array(front_cells, dtype=int)
+        return set(map(tuple, front_cells[self.accessible_many(front_cells)].tolist()))
+
+class AccessibilityCache:
+    """
+    Accessibility of the cells in a fixed world-coordinate window, read from the occupancy grid
+    at most once per cell and shared by every Cartographer mapping rays through that window.
+    Cells outside the window are gathered directly.
+    """
+    UNKNOWN = -1
+
+    def __init__(self, occupancy_grid, origin, min_coords, max_coords):
+        self.occupancy_grid = occupancy_grid
+        self.origin = np.array(origin, dtype=int)
+        self.min_coords = np.array(min_coords, dtype=int)
+        self.shape = np.array(max_coords, dtype=int) - self.min_coords + 1
+        self.state = np.full(tuple(self.shape), self.UNKNOWN, dtype=np.int8)  # Coordinate order
+        self.gathered = 0  # Cells read from the occupancy grid
+
+    def lookup(self, cells):
+        cells = np.asarray(cells, dtype=int).reshape(-1, len(self.origin))
+        local = cells - self.min_coords
+        inside = np.all((local >= 0) & (local < self.shape), axis=1)
+        accessible = np.zeros(len(cells), dtype=bool)
+
+        # Window cells: classify the unknown ones once, then answer from the window
+        window_index = tuple(local[inside].T)
+        state = self.state[window_index]
+        unknown = state == self.UNKNOWN
+        if unknown.any():
+            state[unknown] = gather_accessible(self.occupancy_grid, self.origin, cells[inside][unknown])
+            self.state[window_index] = state
+            self.gathered += int(unknown.sum())
+        accessible[inside] = state == 1
+
+        outside = ~inside
+        if outside.any():
+            accessible[outside] = gather_accessible(self.occupancy_grid, self.origin, cells[outside])
+            self.gathered += int(outside.sum())
+        return accessible
+
+def map_many(starts, ends, occupancy_grid, origin=None, loose=1, storage=None, grid=None, processes=None, compact=False):
+    """
+    Map many rays over the same occupancy grid; returns one Cartographer.map() result per ray.
+    The storage layout is normalized once, a Grid is shared for free-box acceptance (built once
+    for dense grids), and one AccessibilityCache covering every ray classifies each cell once.
+    processes=N splits the rays over a pool of N worker processes, each with its own cache.
+    compact=True returns utils.results.CartographerResult objects, which are much cheaper to
+    send back from worker processes.
+    """
+    starts = np.atleast_2d(np.asarray(starts, dtype=float))
+    ends = np.atleast_2d(np.asarray(ends, dtype=float))
+    if starts.shape != ends.shape:
+        raise ValueError("starts and ends must have the same shape")
+    dimensions = starts.shape[1]
+
+    if grid is not None:
+        occupancy_grid = grid.occupancy_grid if occupancy_grid is None else occupancy_grid
+        origin = grid.origin if origin is None else origin
+    if storage is not None:
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"storage '{storage}' not supported. Choose from: {list(STORAGE_BACKENDS.keys())}")
+        occupancy_grid = STORAGE_BACKENDS[storage](occupancy_grid)  # Normalize once for all rays
+        grid = None  # A shared grid must read the same container
+    if origin is None:
+        origin = getattr(occupancy_grid, 'origin', None)
+    origin = np.zeros(dimensions, dtype=int) if origin is None else np.array(origin, dtype=int)
+
+    if processes is not None and processes > 1 and len(starts) > 1:
+        # Workers get the resolved, already normalized container (each builds its own Grid)
+        chunks = np.array_split(np.arange(len(starts)), min(processes, len(starts)))
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_map_worker,
+                                 initargs=(occupancy_grid, origin, loose, None, compact)) as pool:
+            parts = pool.map(_map_worker_chunk, [(starts[chunk], ends[chunk]) for chunk in chunks])
+            return [result for part in parts for result in part]
+
+    if grid is None and isinstance(occupancy_grid, np.ndarray):
+        grid = Grid(occupancy_grid, loose=loose, origin=origin)
 
-        # Generate all possible moves: {-1, 0, 1} for each dimension
-        for displacement in itertools.product([-1, 0, 1], repeat=dimensions):
-            if all(d == 0 for d in displacement):
-                continue
+    # Front and reachability cells stay within [floor(min) - 1, ceil(max)] of every ray
+    min_coords = np.floor(np.minimum(starts, ends).min(axis=0)).astype(int) - 1
+    max_coords = np.ceil(np.maximum(starts, ends).max(axis=0)).astype(int)
+    accessibility = AccessibilityCache(occupancy_grid, origin, min_coords, max_coords)
 
-            # Check if the number of changing dimensions is within the 'loose' limit
-            num_changed_dims = sum(1 for d in displacement if d != 0)
-            if num_changed_dims > self.loose:
-                continue
+    return [Cartographer(dimensions, start, end, occupancy_grid, origin, loose, grid=grid, accessibility=accessibility).map(compact)
+            for start, end in zip(starts, ends)]
 
-            neighbor = tuple(cell[i] + displacement[i] for i in range(dimensions))
+# Per-process state for map_many(processes=N): the occupancy grid is sent to each worker once
+_map_worker_args = None
 
-            # Check if neighbor is within the search's bounding box
-            is_within_box = all(min_coords[i] <= neighbor[i] <= max_coords[i] for i in range(dimensions))
+def _init_map_worker(occupancy_grid, origin, loose, storage, compact):
+    global _map_worker_args
+    _map_worker_args = (occupancy_grid, origin, loose, storage, compact)
 
-            if is_within_box:
-                neighbors.append(neighbor)
-                
-        return neighbors
+def _map_worker_chunk(rays):
+    starts, ends = rays
+    occupancy_grid, origin, loose, storage, compact = _map_worker_args
+    return map_many(starts, ends, occupancy_grid, origin, loose, storage, compact=compact)
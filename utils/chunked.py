@@ -0,0 +1,172 @@
+import numpy as np
+
+FREE = 0       # Free cell
+OCCUPIED = 1   # Occupied cell
+UNKNOWN = -1   # Unobserved cell, treated as blocked by Grid and Cartographer
+
+"""
+Chunked sparse occupancy grid for large, mostly empty maps.
+
+Cells are stored in fixed-size N-D chunk arrays kept in a dict keyed by chunk coordinate.
+Chunks that were never written are not allocated and read back as the 'default' value
+(FREE or UNKNOWN), so a map spanning kilometers only pays for the regions that contain data.
+
+Coordinates:
+- World coordinates (x, y, z, ...) address cells directly and may be negative; no origin
+  bookkeeping is needed by the caller
+- 'lower' (inclusive) and 'upper' (exclusive) bound the map in world coordinates. They only
+  define the extent seen by Grid/Cartographer; nothing is allocated for them
+- Chunk arrays use the same reversed (array) axis order as a dense occupancy grid
+
+For Grid and Cartographer the container looks like an occupancy ndarray whose 'origin' is
+'lower': 'shape' is in array order and tuple indexing is relative to 'lower'.
+"""
+
+def group_by_chunk(coords, chunk_shape):
+    """
+    Split an (N, D) integer coordinate array into per-chunk groups.
+
+    Yields (chunk key tuple, row positions into coords, (N_k, D) chunk-local coordinates),
+    so callers can do one gather per touched chunk instead of one lookup per cell.
+    """
+    keys = np.floor_divide(coords, chunk_shape)
+    local = coords - keys * chunk_shape
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind='stable')
+    splits = np.cumsum(np.bincount(inverse, minlength=len(unique_keys)))[:-1]
+    for key, rows in zip(unique_keys, np.split(order, splits)):
+        yield tuple(int(k) for k in key), rows, local[rows]
+
+class ChunkedGrid:
+    def __init__(self, lower, upper, chunk_shape=16, default=FREE):
+        self.lower = np.array(lower, dtype=np.int64)
+        self.upper = np.array(upper, dtype=np.int64)
+        self.dimensions = len(self.lower)
+        if len(self.upper) != self.dimensions:
+            raise ValueError(f"upper must have {self.dimensions} coordinates, got {len(self.upper)}")
+        if np.any(self.upper <= self.lower):
+            raise ValueError("upper must be greater than lower in every dimension")
+
+        # Chunk edge length per coordinate axis (a scalar applies to every axis)
+        self.chunk_shape = np.broadcast_to(np.array(chunk_shape, dtype=np.int64), (self.dimensions,)).copy()
+        if np.any(self.chunk_shape < 1):
+            raise ValueError("chunk_shape must be positive")
+
+        if default not in (FREE, UNKNOWN):
+            raise ValueError("default must be FREE or UNKNOWN")
+        self.default = default
+
+        self.chunks = {}  # chunk coordinate tuple -> int8 array of shape chunk_shape[::-1]
+
+    # Array-like view used by Grid and Cartographer
+    @property
+    def origin(self):
+        return self.lower.copy()
+
+    @property
+    def shape(self):
+        return tuple(int(n) for n in (self.upper - self.lower)[::-1])
+
+    @property
+    def ndim(self):
+        return self.dimensions
+
+    def __getitem__(self, array_indices):
+        world_coords, out_shape = self._array_to_world(array_indices)
+        values = self.get_cells(world_coords)
+        return values[0] if out_shape == () else values.reshape(out_shape)
+
+    def __setitem__(self, array_indices, value):
+        world_coords, _ = self._array_to_world(array_indices)
+        self.set_cells(world_coords, value)
+
+    def _array_to_world(self, array_indices):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        if len(array_indices) != self.dimensions:
+            raise IndexError(f"expected {self.dimensions} indices, got {len(array_indices)}")
+        indices = np.broadcast_arrays(*[np.asarray(i, dtype=np.int64) for i in array_indices])
+        out_shape = indices[0].shape
+        # Reverse array order back to coordinate order and shift by the map origin
+        world_coords = np.stack([i.ravel() for i in indices[::-1]], axis=1) + self.lower
+        return world_coords, out_shape
+
+    def __array__(self, dtype=None, copy=None):
+        occupancy = self.to_array()
+        return occupancy if dtype is None else occupancy.astype(dtype)
+
+    def to_array(self):
+        """Dense int8 array of the whole extent (array order). Only sensible for small maps."""
+        occupancy = np.full(self.shape, self.default, dtype=np.int8)
+        for key, chunk in self.chunks.items():
+            chunk_lower = np.array(key, dtype=np.int64) * self.chunk_shape
+            lo = np.maximum(chunk_lower, self.lower)
+            hi = np.minimum(chunk_lower + self.chunk_shape, self.upper)
+            if np.any(hi <= lo):
+                continue
+            dst = tuple(slice(int(l), int(h)) for l, h in zip((lo - self.lower)[::-1], (hi - self.lower)[::-1]))
+            src = tuple(slice(int(l), int(h)) for l, h in zip((lo - chunk_lower)[::-1], (hi - chunk_lower)[::-1]))
+            occupancy[dst] = chunk[src]
+        return occupancy
+
+    # World-coordinate access
+    def get_cells(self, world_coords):
+        """Vectorized lookup of an (N, D) array of world coordinates; returns int8 values."""
+        world_coords = np.atleast_2d(np.asarray(world_coords, dtype=np.int64))
+        values = np.full(len(world_coords), self.default, dtype=np.int8)
+        if len(world_coords) == 0:
+            return values
+        for key, rows, local in group_by_chunk(world_coords, self.chunk_shape):
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                values[rows] = chunk[tuple(local[:, ::-1].T)]  # One gather per touched chunk
+        return values
+
+    def set_cells(self, world_coords, value):
+        """Vectorized write of one value (or one value per row) to an (N, D) array of world coordinates."""
+        world_coords = np.atleast_2d(np.asarray(world_coords, dtype=np.int64))
+        values = np.broadcast_to(np.asarray(value, dtype=np.int8), (len(world_coords),))
+        if len(world_coords) == 0:
+            return
+        for key, rows, local in group_by_chunk(world_coords, self.chunk_shape):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                if np.all(values[rows] == self.default):
+                    continue  # Writing the default into a missing chunk is a no-op
+                chunk = np.full(self.chunk_shape[::-1], self.default, dtype=np.int8)
+                self.chunks[key] = chunk
+            chunk[tuple(local[:, ::-1].T)] = values[rows]
+
+    def set_box(self, lower, upper, value=OCCUPIED):
+        """Write a value to the half-open world-coordinate box [lower, upper), chunk by chunk."""
+        lower = np.array(lower, dtype=np.int64)
+        upper = np.array(upper, dtype=np.int64)
+        if np.any(upper <= lower):
+            return
+        first = np.floor_divide(lower, self.chunk_shape)
+        last = np.floor_divide(upper - 1, self.chunk_shape)
+        for key in np.ndindex(*(last - first + 1)):
+            key = tuple(int(k) for k in np.array(key) + first)
+            chunk_lower = np.array(key, dtype=np.int64) * self.chunk_shape
+            lo = np.maximum(lower, chunk_lower) - chunk_lower
+            hi = np.minimum(upper, chunk_lower + self.chunk_shape) - chunk_lower
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                if value == self.default:
+                    continue
+                chunk = np.full(self.chunk_shape[::-1], self.default, dtype=np.int8)
+                self.chunks[key] = chunk
+            chunk[tuple(slice(int(l), int(h)) for l, h in zip(lo[::-1], hi[::-1]))] = value
+
+    def drop_default_chunks(self):
+        """Release chunks that only contain the default value."""
+        for key in [key for key, chunk in self.chunks.items() if np.all(chunk == self.default)]:
+            del self.chunks[key]
+
+    def chunk_count(self):
+        return len(self.chunks)
+
+    @property
+    def nbytes(self):
+        return sum(chunk.nbytes for chunk in self.chunks.values())
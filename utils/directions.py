@@ -0,0 +1,48 @@
+import numpy as np
+from functools import lru_cache
+from itertools import combinations, product
+
+"""
+Movement direction tables shared by Grid, BFS and Cartographer.
+
+A direction changes between 1 and 'loose' coordinates by -1 or +1. Instead of filtering all
+3^D offsets, directions are built combinatorially (choose up to 'loose' axes, then a sign per
+chosen axis), e.g. 128 moves for D=8, loose=2 instead of scanning 6561 candidates.
+
+Tables are cached per (dimensions, loose) and returned read-only. They are sorted into the
+same lexicographic order as itertools.product([-1, 0, 1], repeat=D), so searches that break
+ties by direction order behave exactly as before.
+"""
+
+@lru_cache(maxsize=None)
+def direction_tuples(dimensions, loose):
+    """Valid directions for the dimension count and 'loose' constraint, as a tuple of tuples."""
+    directions = []
+    for num_axes in range(1, min(loose, dimensions) + 1):
+        for axes in combinations(range(dimensions), num_axes):
+            for signs in product((-1, 1), repeat=num_axes):
+                direction = [0] * dimensions
+                for axis, sign in zip(axes, signs):
+                    direction[axis] = sign
+                directions.append(tuple(direction))
+    directions.sort()
+    return tuple(directions)
+
+@lru_cache(maxsize=None)
+def direction_offsets(dimensions, loose):
+    """Valid directions as a read-only (M, D) int array in coordinate order."""
+    offsets = np.array(direction_tuples(dimensions, loose), dtype=np.int64).reshape(-1, dimensions)
+    offsets.flags.writeable = False
+    return offsets
+
+@lru_cache(maxsize=None)
+def flat_direction_offsets(dimensions, loose, shape):
+    """
+    Flat-index deltas of the valid directions for a C-ordered array of the given shape.
+    The shape is in array order; directions are in coordinate order (x is the last array axis).
+    """
+    shape = tuple(int(s) for s in shape)
+    array_strides = [int(np.prod(shape[axis + 1:], dtype=np.int64)) for axis in range(len(shape))]
+    deltas = direction_offsets(dimensions, loose) @ np.array(array_strides[::-1], dtype=np.int64)
+    deltas.flags.writeable = False
+    return deltas
@@ -0,0 +1,79 @@
+import numpy as np
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.distance import squared_edt
+
+"""
+Robot footprints and obstacle inflation.
+
+Planning a non-point robot on a point-robot planner is done by inflating every obstacle by
+the robot footprint (the Minkowski sum). Both supported footprints are handled separably:
+- 'box': half-extent per dimension; one 1D max filter per axis (running window counts)
+- 'ball': radius per dimension (an ellipsoid); one weighted 1D min-plus pass per axis of the
+  exact distance transform, keeping cells within normalized distance 1 of an obstacle
+
+Radii are in cells and given in coordinate order (x, y, z, ...); a scalar applies to every axis.
+"""
+class Footprint:
+    def __init__(self, radius, shape='box'):
+        if shape not in ('box', 'ball'):
+            raise ValueError(f"Footprint shape '{shape}' not supported. Use 'box' or 'ball'")
+        self.shape = shape
+        self.radius = tuple(float(r) for r in np.atleast_1d(radius))
+        if any(r < 0 for r in self.radius):
+            raise ValueError("Footprint radius must be non-negative")
+
+    def radius_for(self, dimensions):
+        """Per-dimension radius in coordinate order."""
+        if len(self.radius) == 1:
+            return np.full(dimensions, self.radius[0])
+        if len(self.radius) != dimensions:
+            raise ValueError(f"Footprint radius must have 1 or {dimensions} values, got {len(self.radius)}")
+        return np.array(self.radius)
+
+    def reach_for(self, dimensions):
+        """Whole cells an obstacle can spread along each coordinate axis."""
+        return np.floor(self.radius_for(dimensions)).astype(int)
+
+    def __eq__(self, other):
+        return isinstance(other, Footprint) and (self.shape, self.radius) == (other.shape, other.radius)
+
+    def __hash__(self):
+        return hash((self.shape, self.radius))
+
+    def __repr__(self):
+        return f"Footprint(radius={self.radius}, shape='{self.shape}')"
+
+def inflate_occupancy(occupancy, footprint):
+    """Inflate a boolean occupancy array (array order) by the footprint."""
+    occupancy = np.asarray(occupancy, dtype=bool)
+    radius = footprint.radius_for(occupancy.ndim)[::-1]  # Array order
+
+    if footprint.shape == 'box':
+        inflated = occupancy
+        for axis, reach in enumerate(np.floor(radius).astype(int)):
+            inflated = _max_filter_axis(inflated, axis, reach)
+        return inflated
+
+    # Ball: normalized squared distance sum((d_i / r_i)^2) <= 1, axes with zero radius never spread
+    with np.errstate(divide='ignore'):
+        weights = np.where(radius > 0, 1.0 / np.square(radius), np.inf)
+    return squared_edt(occupancy, weights) <= 1.0
+
+def _max_filter_axis(occupancy, axis, reach):
+    """Boolean max filter with window 2 * reach + 1 along one axis, via running counts."""
+    if reach <= 0:
+        return occupancy.copy()
+    n = occupancy.shape[axis]
+    counts = np.cumsum(occupancy, axis=axis, dtype=np.int64)
+    pad = [(0, 0)] * occupancy.ndim
+    pad[axis] = (1, 0)
+    counts = np.pad(counts, pad)  # counts[i] = number of occupied cells before index i
+
+    index = np.arange(n)
+    upper = np.take(counts, np.minimum(index + reach + 1, n), axis=axis)
+    lower = np.take(counts, np.maximum(index - reach, 0), axis=axis)
+    return upper > lower
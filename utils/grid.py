@@ -1,5 +1,27 @@
 import numpy as np
-from itertools import product
+import copy
+import os
+import sys
+import threading
+from itertools import count
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.paged import PagedGrid
+from utils.bitpacked import BitPackedGrid
+from utils.morton import MortonGrid
+from utils.raytracer import Raytracer
+from utils.directions import direction_tuples, direction_offsets, flat_direction_offsets
+from utils.distance import squared_edt
+from utils.footprint import inflate_occupancy
+from utils.labeling import label_components
+
+_grid_uids = count()  # Process-unique Grid identifiers (never reused, unlike id())
+
+# Storage layouts the occupancy grid can be normalized into via Grid(storage=...)
+STORAGE_BACKENDS = {
+    'packed': BitPackedGrid,
+    'morton': MortonGrid,
+}
 
 """
 Path planner that uses raytracing to navigate through an occupancy grid.
@@ -12,12 +34,22 @@ dimensions can move simultaneously:
 - loose = n: can move in up to n dimensions simultaneously
 """
 class Grid:
-    def __init__(self, occupancy_grid, loose=1, origin=None):
+    def __init__(self, occupancy_grid, loose=1, origin=None, storage=None, padded_occupancy=None):
+        # Dense ndarray or an array-like occupancy container (utils.ntree.NTree, utils.chunked.ChunkedGrid,
+        # utils.paged.PagedGrid) exposing 'shape' and tuple indexing in array order
+        if isinstance(occupancy_grid, (str, os.PathLike)):
+            occupancy_grid = PagedGrid(occupancy_grid)  # Memory-map an .npy file with the default cache budget
+        if storage is not None:
+            if storage not in STORAGE_BACKENDS:
+                raise ValueError(f"storage '{storage}' not supported. Choose from: {list(STORAGE_BACKENDS.keys())}")
+            occupancy_grid = STORAGE_BACKENDS[storage](occupancy_grid)  # Normalize once into the chosen layout
         self.occupancy_grid = occupancy_grid
         self.loose = loose
         self.dimensions = len(occupancy_grid.shape)
         
-        # Set grid origin coordinates (defaults to zero origin)
+        # Set grid origin coordinates (defaults to the container's own origin, else zero)
+        if origin is None:
+            origin = getattr(occupancy_grid, 'origin', None)
         if origin is None:
             self.origin = np.zeros(self.dimensions, dtype=int)
         else:
@@ -34,6 +66,81 @@ class Grid:
             raise ValueError("Invalid inputs provided to GridPathPlanner")
         
         self.valid_directions = self._generate_valid_directions()
+        
+        # Sentinel-padded occupancy copy: occupied layers around the grid (one below, two above so
+        # vertex-mode neighbors at index n + 1 still land inside), so any cell or node within one
+        # step of the grid can be read through a flat index without per-dimension bounds checks
+        self.padded_occupancy = self._build_padded_occupancy(padded_occupancy)
+        self._node_masks = {}         # mode -> flat mask of valid node indices in the padded layout
+        self._edge_cell_offsets = {}  # mode -> relative cells intersected by each direction's edge
+        
+        self.uid = next(_grid_uids)
+        self.version = 0              # Incremented on every update_cells call
+        self._change_listeners = []   # Called as listener(grid, changed_cells) after update_cells
+        self._clearance_sq = None     # Squared distance transform of free space, built lazily
+        self._inflated = {}           # Footprint -> inflated occupancy array, built lazily
+        self._inflated_grids = {}     # Footprint -> Grid over the inflated occupancy, built lazily
+        self._summed_area = None      # N-D integral image of occupancy, built lazily
+        self._component_labels = {}   # mode -> connected-component label per node, built lazily
+        self._vertex_enclosed = None  # Vertices whose 2^D surrounding cells are all occupied, built lazily
+        self._vertex_edge_words = None  # Traversable vertex edges as one bit word per vertex, built lazily
+        self._cache_lock = threading.RLock()  # Serializes lazy builds, so concurrent readers build each cache once
+    
+    def _build_padded_occupancy(self, padded=None):
+        if not isinstance(self.occupancy_grid, np.ndarray):
+            return None  # Sparse and out-of-core containers are never densified
+        
+        if padded is None:
+            padded = np.pad(self.occupancy_grid != 0, (1, 2), mode='constant', constant_values=True)
+        elif padded.shape != tuple(n + 3 for n in self.occupancy_grid.shape) or padded.dtype != bool:
+            raise ValueError("padded_occupancy must be a bool array padded by (1, 2) cells on every axis")
+        self.padded_flat = padded.ravel()  # Contiguous, so this is a view
+        
+        # Flat-index strides in coordinate order (x is the last array axis)
+        self.padded_strides = np.array(padded.strides[::-1], dtype=np.int64) // padded.itemsize
+        return padded
+    
+    def padded_flat_index(self, cell_coords):
+        """Flat index into the padded occupancy for world coordinates (no bounds checks)."""
+        return (np.asarray(cell_coords, dtype=np.int64) - self.origin + 1) @ self.padded_strides
+    
+    def direction_flat_offsets(self, shape=None):
+        """Flat-index delta of every valid direction for an array shape (defaults to the padded layout)."""
+        if shape is None:
+            shape = self.padded_occupancy.shape
+        return flat_direction_offsets(self.dimensions, self.loose, tuple(shape))
+    
+    def direction_array(self):
+        """Valid directions as a shared read-only (M, D) int array."""
+        return direction_offsets(self.dimensions, self.loose)
+    
+    def node_mask(self, mode):
+        """Flat mask over the padded layout marking valid node indices (cells: [0, n), vertices: [0, n])."""
+        with self._cache_lock:
+            if mode not in self._node_masks:
+                bounds = self.num_cells if mode == 'cell' else self.num_vertices
+                mask = np.zeros(self.padded_occupancy.shape, dtype=bool)
+                mask[tuple(slice(1, 1 + b) for b in bounds[::-1])] = True
+                self._node_masks[mode] = mask.ravel()
+            return self._node_masks[mode]
+    
+    def edge_cell_offsets(self, mode):
+        """
+        Cells intersected by the edge along each valid direction, relative to the source node.
+        Edges are translation invariant, so every direction is raytraced only once per mode.
+        In cell mode the source cell itself is excluded, matching the BFS edge rule.
+        """
+        with self._cache_lock:
+            if mode not in self._edge_cell_offsets:
+                start = np.zeros(self.dimensions) if mode == 'vertex' else np.full(self.dimensions, 0.5)
+                offsets = []
+                for direction in self.valid_directions:
+                    cells = Raytracer(self.dimensions, start, start + np.array(direction)).trace()
+                    if mode == 'cell':
+                        cells = [cell for cell in cells if any(cell)]
+                    offsets.append(np.array(cells, dtype=np.int64).reshape(-1, self.dimensions))
+                self._edge_cell_offsets[mode] = offsets
+            return self._edge_cell_offsets[mode]
     
     def _validate_inputs(self):
         if self.occupancy_grid is None:
@@ -73,6 +180,20 @@ class Grid:
         # Check occupancy
         return bool(self.occupancy_grid[array_indices])
     
+    def occupied_many(self, cell_coords):
+        """Vectorized is_cell_occupied for an (N, D) array of world coordinates; returns a bool array."""
+        grid_indices = np.asarray(cell_coords, dtype=np.int64).reshape(-1, self.dimensions) - self.origin
+        
+        # Out-of-bounds cells are considered occupied
+        array_shape = np.array(self.occupancy_grid.shape[::-1])  # Coordinate order
+        in_bounds = np.all((grid_indices >= 0) & (grid_indices < array_shape), axis=1)
+        occupied = np.ones(len(grid_indices), dtype=bool)
+        
+        # One fancy-index gather for all in-bounds cells, coordinates reversed to array order
+        inside = grid_indices[in_bounds]
+        occupied[in_bounds] = np.asarray(self.occupancy_grid[tuple(inside[:, ::-1].T)]) != 0
+        return occupied
+    
     def world_to_grid(self, world_coords):
         return np.array(world_coords) - self.origin
     
@@ -108,16 +229,591 @@ class Grid:
                 return False
         return True
 
-    # Get valid movement directions based on the 'loose' constraint.
+    def shared_tables(self, mode):
+        """
+        Precomputed arrays a search in the given mode reads (padded occupancy, component labels and,
+        in vertex mode, edge words), built now if needed. Other processes can map copies of them
+        (e.g. in shared memory) and hand them to adopt_tables instead of rebuilding them.
+        """
+        tables = {}
+        if self.component_labels(mode) is not None:
+            tables['component_labels'] = self.component_labels(mode)
+        if self.padded_occupancy is not None:
+            tables['padded_occupancy'] = self.padded_occupancy
+        if mode == 'vertex' and self.vertex_edge_words() is not None:
+            tables['vertex_edge_words'] = self.vertex_edge_words()
+        return tables
+    
+    def adopt_tables(self, mode, tables):
+        """Use precomputed arrays from shared_tables of a grid with the same occupancy (not copied)."""
+        if 'component_labels' in tables:
+            self._component_labels[mode] = tables['component_labels']
+        if 'vertex_edge_words' in tables:
+            self._vertex_edge_words = tables['vertex_edge_words']
+    
+    # Get valid movement directions based on the 'loose' constraint (shared, cached per (D, loose)).
     def _generate_valid_directions(self):
-        directions = []
-        for offset in product([-1, 0, 1], repeat=self.dimensions):
-            if offset == (0,) * self.dimensions:
-                continue  # Skip no-movement case
-
-            # Check dimensionality constraint (loose)
-            if 1 <= sum(1 for o in offset if o != 0) <= self.loose:
-                directions.append(offset)
-
-        return directions
+        return list(direction_tuples(self.dimensions, self.loose))
+    
+    def _dense_occupancy(self, region=None):
+        """Boolean occupancy as a dense array in array order (unknown cells count as occupied)."""
+        if isinstance(self.occupancy_grid, np.ndarray):
+            occupancy = self.occupancy_grid if region is None else self.occupancy_grid[region]
+            return occupancy != 0
+        occupancy = np.asarray(self.occupancy_grid) != 0
+        return occupancy if region is None else occupancy[region]
+    
+    def update_cells(self, cell_coords, occupied=True):
+        """
+        Set the occupancy of an (N, D) array of world coordinates, writing through to the
+        occupancy grid, and patch derived data (padded copy, distance transform) incrementally.
+        """
+        cells = np.asarray(cell_coords, dtype=np.int64).reshape(-1, self.dimensions)
+        grid_indices = cells - self.origin
+        if np.any((grid_indices < 0) | (grid_indices >= self.num_cells)):
+            raise ValueError("update_cells coordinates must lie within the grid")
+        occupied = np.broadcast_to(np.asarray(occupied, dtype=bool), (len(cells),))
+        
+        # Keep only the last write to each cell so incremental patches see each change once
+        _, last = np.unique(cells[::-1], axis=0, return_index=True)
+        keep = np.sort(len(cells) - 1 - last)
+        cells, grid_indices, occupied = cells[keep], grid_indices[keep], occupied[keep]
+        
+        array_indices = grid_indices[:, ::-1]
+        with self._cache_lock:
+            previous = self._write_cells(cells, array_indices, occupied)
+        
+        changed = previous != occupied
+        if self._change_listeners and changed.any():
+            for listener in list(self._change_listeners):
+                listener(self, cells[changed])
+    
+    def _write_cells(self, cells, array_indices, occupied):
+        """Write the occupancy and patch or drop derived data; returns the previous occupancy."""
+        previous = self.occupied_many(cells)
+        if isinstance(self.occupancy_grid, np.ndarray):
+            self.occupancy_grid[tuple(array_indices.T)] = occupied
+        else:
+            for index, value in zip(array_indices, occupied):
+                self.occupancy_grid[tuple(int(i) for i in index)] = value
+        if self.padded_occupancy is not None:
+            self.padded_occupancy[tuple((array_indices + 1).T)] = occupied
+        
+        self.version += 1
+        self._component_labels.clear()  # Any single cell can split or join components
+        self._vertex_enclosed = None
+        self._vertex_edge_words = None
+        changed = previous != occupied
+        self._patch_clearance(array_indices[changed], occupied[changed])
+        self._patch_inflated(array_indices)
+        self._patch_summed_area(array_indices, previous, occupied)
+        return previous
+    
+    def updated(self, cell_coords, occupied=True):
+        """
+        Copy-on-write update_cells: a new Grid with the cells changed, leaving this grid, its
+        occupancy and its caches untouched, so threads still reading it never see a partial update.
+        Arrays update_cells would patch are copied; everything else (direction and node tables)
+        is shared. The new grid gets a new uid and no change listeners. Needs a dense ndarray grid.
+        """
+        if not isinstance(self.occupancy_grid, np.ndarray):
+            raise ValueError("Copy-on-write updates need a dense ndarray occupancy grid")
+        with self._cache_lock:
+            grid = copy.copy(self)
+            grid.occupancy_grid = self.occupancy_grid.copy()
+            grid.padded_occupancy = grid._build_padded_occupancy(self.padded_occupancy.copy())
+            grid._clearance_sq = None if self._clearance_sq is None else self._clearance_sq.copy()
+            grid._inflated = {footprint: inflated.copy() for footprint, inflated in self._inflated.items()}
+            grid._inflated_grids = {}  # Rebuilt lazily around the copied arrays
+            grid._summed_area = None if self._summed_area is None else self._summed_area.copy()
+            grid._component_labels = {}
+            grid._node_masks = dict(self._node_masks)
+            grid._edge_cell_offsets = dict(self._edge_cell_offsets)
+        grid.uid = next(_grid_uids)
+        grid._change_listeners = []
+        grid._cache_lock = threading.RLock()
+        grid.update_cells(cell_coords, occupied)
+        return grid
+    
+    def add_change_listener(self, listener):
+        """Register listener(grid, changed_cells) to be called with the world coordinates of cells whose occupancy changed."""
+        with self._cache_lock:
+            self._change_listeners.append(listener)
+    
+    def remove_change_listener(self, listener):
+        with self._cache_lock:
+            self._change_listeners.remove(listener)
+    
+    # Distance transform / clearance
+    def _squared_clearance(self):
+        with self._cache_lock:
+            if self._clearance_sq is None:
+                # The grid boundary counts as occupied: pad with one obstacle layer, then crop
+                padded = np.pad(self._dense_occupancy(), 1, mode='constant', constant_values=True)
+                self._clearance_sq = squared_edt(padded)[(slice(1, -1),) * self.dimensions]
+            return self._clearance_sq
+    
+    def _patch_clearance(self, array_indices, occupied):
+        if self._clearance_sq is None or not len(array_indices):
+            return
+        # Both kinds of change only reach cells within the current largest clearance
+        radius = int(np.ceil(np.sqrt(np.max(self._clearance_sq))))
+        added, freed = array_indices[occupied], array_indices[~occupied]
+        
+        # New obstacles only lower distances
+        if len(added):
+            lo = np.maximum(added.min(axis=0) - radius, 0)
+            hi = np.minimum(added.max(axis=0) + radius + 1, self.occupancy_grid.shape)
+            window = tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))
+            
+            new_obstacles = np.zeros(hi - lo, dtype=bool)
+            new_obstacles[tuple((added - lo).T)] = True
+            np.minimum(self._clearance_sq[window], squared_edt(new_obstacles), out=self._clearance_sq[window])
+        
+        # Freed cells raise the distances of cells whose nearest obstacle they were: recompute those
+        if len(freed):
+            lo = np.maximum(freed.min(axis=0) - radius, 0)
+            hi = np.minimum(freed.max(axis=0) + radius + 1, self.occupancy_grid.shape)
+            window = tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))
+            self._clearance_sq[window] = self._local_squared_clearance(lo, hi, radius)
+    
+    def _local_squared_clearance(self, lo, hi, margin):
+        """
+        Exact squared clearance of the array-order window [lo, hi), from a distance transform of the
+        window grown by a margin. A value is exact when it does not exceed the distance to the grown
+        window's inner edges (obstacles beyond them are farther); otherwise the margin is doubled.
+        """
+        shape = np.array(self.occupancy_grid.shape)
+        margin = max(int(margin), 1)
+        while True:
+            context_lo = np.maximum(lo - margin, 0)
+            context_hi = np.minimum(hi + margin, shape)
+            context = tuple(slice(int(l), int(h)) for l, h in zip(context_lo, context_hi))
+            
+            # The grid boundary counts as occupied, so pad with an obstacle layer only where it is reached
+            at_lo, at_hi = context_lo == 0, context_hi == shape
+            padded = np.pad(self._dense_occupancy(context), [(int(a), int(b)) for a, b in zip(at_lo, at_hi)],
+                            mode='constant', constant_values=True)
+            squared = squared_edt(padded)[tuple(slice(int(a), int(a) + int(h - l)) for a, l, h in zip(at_lo, context_lo, context_hi))]
+            inner = squared[tuple(slice(int(l), int(h)) for l, h in zip(lo - context_lo, hi - context_lo))]
+            if np.all(at_lo) and np.all(at_hi):
+                return inner
+            
+            # Squared distance from each window cell to the nearest cell beyond an inner edge
+            gap = np.full(inner.shape, np.inf)
+            for axis in range(len(shape)):
+                index = np.arange(lo[axis], hi[axis])
+                reach = np.full(len(index), np.inf)
+                if not at_lo[axis]:
+                    reach = np.minimum(reach, index - context_lo[axis] + 1)
+                if not at_hi[axis]:
+                    reach = np.minimum(reach, context_hi[axis] - index)
+                view = [1] * len(shape)
+                view[axis] = -1
+                gap = np.minimum(gap, reach.reshape(view) ** 2)
+            if np.all(inner <= gap):
+                return inner
+            margin *= 2
+    
+    def distance_transform(self):
+        """
+        Euclidean distance (in cells, center to center) from every cell to the nearest occupied or
+        out-of-bounds cell, in array order. Occupied cells are 0. Built once, patched by update_cells.
+        """
+        return np.sqrt(self._squared_clearance())
+    
+    def clearance_many(self, cell_coords):
+        """Clearance of an (N, D) array of world coordinates (0 for occupied or out-of-bounds cells)."""
+        grid_indices = np.asarray(cell_coords, dtype=np.int64).reshape(-1, self.dimensions) - self.origin
+        in_bounds = np.all((grid_indices >= 0) & (grid_indices < self.num_cells), axis=1)
+        clearance = np.zeros(len(grid_indices))
+        inside = grid_indices[in_bounds]
+        clearance[in_bounds] = np.sqrt(self._squared_clearance()[tuple(inside[:, ::-1].T)])
+        return clearance
+    
+    def clearance(self, cell_coords):
+        return float(self.clearance_many([cell_coords])[0])
+    
+    def nearest_free_cell(self, cell_coords, max_radius=None):
+        """
+        Nearest free cell (Euclidean, world coordinates) to the given cell, or None if there is none
+        (within max_radius cells, if given). Dense grids read the distance transform; other
+        containers are read box by box around the cell, so they are never densified.
+        """
+        target = np.asarray(cell_coords, dtype=np.int64) - self.origin
+        dense = isinstance(self.occupancy_grid, np.ndarray)
+        free = self._squared_clearance() > 0 if dense else None  # Only occupied cells have zero clearance
+        
+        # Search growing boxes; a hit within the box's inscribed radius is the global nearest
+        radius = 1
+        while True:
+            if max_radius is not None and radius > max_radius:
+                radius = int(max_radius)
+            lo = np.clip(target - radius, 0, self.num_cells)
+            hi = np.clip(target + radius + 1, 0, self.num_cells)
+            covers_grid = np.all(lo == 0) and np.all(hi == self.num_cells)
+            if np.all(hi > lo):
+                if dense:
+                    box = free[tuple(slice(int(l), int(h)) for l, h in zip(lo[::-1], hi[::-1]))]
+                    candidates = np.argwhere(box)[:, ::-1] + lo  # Back to coordinate order
+                else:
+                    cells = np.indices(hi - lo).reshape(self.dimensions, -1).T + lo
+                    candidates = cells[~self.occupied_many(cells + self.origin)]
+                if len(candidates):
+                    squared = np.sum((candidates - target) ** 2, axis=1)
+                    best = int(np.argmin(squared))
+                    if squared[best] <= radius * radius or covers_grid:
+                        return candidates[best] + self.origin
+            if covers_grid or (max_radius is not None and radius >= max_radius):
+                return None
+            radius *= 2
+    
+    def segment_is_free(self, start_coords, end_coords):
+        """
+        True if no cell intersected by the segment (as traced by Raytracer) is occupied or out of
+        bounds. Sphere tracing skips open space using the distance transform; only stretches near
+        obstacles are traversed cell by cell.
+        """
+        start = np.asarray(start_coords, dtype=float)
+        end = np.asarray(end_coords, dtype=float)
+        delta = end - start
+        length = np.linalg.norm(delta)
+        
+        lower = self.origin.astype(float)
+        upper = lower + self.num_cells
+        squared = self._squared_clearance()
+        # A point lies within sqrt(D)/2 of its cell center, and so does any obstacle box of its center
+        margin = np.sqrt(self.dimensions)
+        
+        def safe_distance(point):
+            """Lower bound on the distance from a point to any occupied cell box (None outside the grid)."""
+            if np.any(point < lower) or np.any(point > upper):
+                return None
+            index = np.clip(np.floor(point - lower).astype(int), 0, self.num_cells - 1)
+            return np.sqrt(squared[tuple(index[::-1])]) - margin
+        
+        raytracer = Raytracer(self.dimensions, start, end)
+        t = 0.0
+        while t < 1.0:
+            point = start + t * delta
+            safe = safe_distance(point)
+            if safe is None:
+                return False  # The segment leaves the grid
+            
+            # Keep 1.5 cells of slack so cells around the stop point are known to be free
+            if length > 0 and safe - 1.5 >= 0.5:
+                t = min(1.0, t + (safe - 1.5) / length)
+                continue
+            
+            # Close to obstacles: traverse exactly until the ray is back in open space. The segment's
+            # own raytracer is advanced rather than restarted at the point, so its crossings (and their
+            # rounding near the end, which can add the end point's front) match Raytracer.trace.
+            raytracer.advance(t)
+            resumed = False
+            while not raytracer.reached():
+                front_cells = raytracer.front_cells()
+                if front_cells and self.occupied_many(front_cells).any():
+                    return False
+                if not raytracer.next():
+                    break
+                if not raytracer.reached():
+                    safe = safe_distance(raytracer.x0)
+                    if safe is not None and safe > 2.5:
+                        t = raytracer.t
+                        resumed = True
+                        break
+            if not resumed:
+                final_cells = raytracer.front_cells()
+                return not (final_cells and self.occupied_many(final_cells).any())
+        return True
+    
+    # Footprint inflation
+    def inflated(self, footprint):
+        """
+        Occupancy inflated by a robot footprint (utils.footprint.Footprint), in array order.
+        Cached per footprint and patched incrementally by update_cells; treat it as read-only.
+        """
+        with self._cache_lock:
+            if footprint not in self._inflated:
+                self._inflated[footprint] = inflate_occupancy(self._dense_occupancy(), footprint)
+            return self._inflated[footprint]
+    
+    def inflated_grid(self, footprint):
+        """
+        Grid over the inflated occupancy, sharing this grid's origin and 'loose' setting. Cached per
+        footprint, so its own caches (padded copy, component labels, ...) are built once; update_cells
+        forwards the resulting inflated changes to it.
+        """
+        with self._cache_lock:
+            if footprint not in self._inflated_grids:
+                self._inflated_grids[footprint] = Grid(self.inflated(footprint), loose=self.loose, origin=self.origin)
+            return self._inflated_grids[footprint]
+    
+    def _patch_inflated(self, array_indices):
+        shape = np.array(self.occupancy_grid.shape)
+        for footprint, inflated in self._inflated.items():
+            reach = footprint.reach_for(self.dimensions)[::-1]  # Array order
+            
+            # Cells whose inflated value can change, and the base cells that influence them
+            lo = np.maximum(array_indices.min(axis=0) - reach, 0)
+            hi = np.minimum(array_indices.max(axis=0) + reach + 1, shape)
+            context_lo = np.maximum(lo - reach, 0)
+            context_hi = np.minimum(hi + reach, shape)
+            
+            context = tuple(slice(int(l), int(h)) for l, h in zip(context_lo, context_hi))
+            patch = inflate_occupancy(self._dense_occupancy(context), footprint)
+            inner = tuple(slice(int(l), int(h)) for l, h in zip(lo - context_lo, hi - context_lo))
+            window = tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))
+            inflated_grid = self._inflated_grids.get(footprint)
+            if inflated_grid is None:
+                inflated[window] = patch[inner]
+                continue
+            
+            # Write through the inflated Grid, so it patches its own derived data and notifies listeners
+            changed = np.argwhere(inflated[window] != patch[inner])
+            if len(changed):
+                values = patch[inner][tuple(changed.T)]
+                inflated_grid.update_cells((changed + lo)[:, ::-1] + self.origin, values)
+    
+    # Summed-area table (N-D integral image) for box queries
+    def supports_box_queries(self):
+        """True if box queries can be answered: they read a summed-area table, built only for dense ndarray grids."""
+        return isinstance(self.occupancy_grid, np.ndarray)
+    
+    def _summed_area_table(self):
+        if not self.supports_box_queries():
+            return None  # Sparse and out-of-core containers are never densified
+        with self._cache_lock:
+            if self._summed_area is None:
+                # Leading zero layer on every axis: table[i] counts occupied cells in [0, i)
+                table = self._dense_occupancy().astype(np.int64)
+                for axis in range(self.dimensions):
+                    np.cumsum(table, axis=axis, out=table)
+                
+                # Corner selectors and inclusion-exclusion signs for the 2^D lookups of a box query
+                corners = np.array([[(b >> axis) & 1 for axis in range(self.dimensions)]
+                                    for b in range(1 << self.dimensions)], dtype=bool)
+                self._box_corners = corners
+                self._box_signs = np.where((self.dimensions - corners.sum(axis=1)) % 2 == 0, 1, -1)
+                self._summed_area = np.pad(table, [(1, 0)] * self.dimensions)  # Published last
+            return self._summed_area
+    
+    def _patch_summed_area(self, array_indices, previous, occupied):
+        if self._summed_area is None:
+            return
+        changed = np.flatnonzero(previous != occupied)
+        if len(changed) > 16:
+            self._summed_area = None  # Many edits: rebuilding is cheaper than suffix updates
+            return
+        for i in changed:
+            # A cell contributes to every prefix that starts after it
+            suffix = tuple(slice(int(index) + 1, None) for index in array_indices[i])
+            self._summed_area[suffix] += 1 if occupied[i] else -1
+    
+    def box_counts(self, min_coords, max_coords):
+        """
+        Occupied cells in each inclusive world-coordinate box [min, max], for (N, D) arrays of
+        corners, using 2^D table lookups per box. Out-of-bounds cells count as occupied.
+        Needs a dense ndarray grid (see supports_box_queries).
+        """
+        table = self._summed_area_table()
+        if table is None:
+            raise ValueError("Box queries need a dense ndarray occupancy grid")
+        lo = np.asarray(min_coords, dtype=np.int64).reshape(-1, self.dimensions) - self.origin
+        hi = np.asarray(max_coords, dtype=np.int64).reshape(-1, self.dimensions) - self.origin + 1
+        volume = np.prod(np.maximum(hi - lo, 0), axis=1)
+        
+        lo_in = np.clip(lo, 0, self.num_cells)
+        hi_in = np.clip(hi, 0, self.num_cells)
+        inside_volume = np.prod(np.maximum(hi_in - lo_in, 0), axis=1)
+        hi_in = np.maximum(hi_in, lo_in)  # Empty in-bounds part gives a zero count
+        
+        # Gather all 2^D corners at once (coordinates reversed to array order)
+        corners = np.where(self._box_corners[None, :, :], hi_in[:, None, :], lo_in[:, None, :])
+        values = table[tuple(corners[:, :, ::-1].transpose(2, 0, 1))]
+        occupied = values @ self._box_signs
+        return occupied + (volume - inside_volume)
+    
+    def box_count(self, min_coords, max_coords):
+        return int(self.box_counts([min_coords], [max_coords])[0])
+    
+    def is_box_free(self, min_coords, max_coords):
+        """True if every cell of the inclusive world-coordinate box is in bounds and unoccupied."""
+        return self.box_count(min_coords, max_coords) == 0
 
+    
+    # Connected components of the search graph
+    def _node_space_free(self, mode):
+        """
+        Free cells as the search sees them: indexed by node coordinates (grid indices, not world
+        coordinates) over the mode's node bounds, with cells outside the occupancy grid occupied.
+        """
+        node_shape = (self.num_cells if mode == 'cell' else self.num_vertices)[::-1]  # Array order
+        occupancy = self._dense_occupancy()
+        if not np.any(self.origin) and mode == 'cell':
+            return ~occupancy
+        
+        # Node index c reads occupancy[c - origin]; copy the overlapping block, the rest stays occupied
+        shift = self.origin[::-1]
+        lo = np.clip(shift, 0, node_shape)
+        hi = np.clip(shift + occupancy.shape, lo, node_shape)
+        free = np.zeros(node_shape, dtype=bool)
+        free[tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))] = \
+            ~occupancy[tuple(slice(int(l), int(h)) for l, h in zip(lo - shift, hi - shift))]
+        return free
+    
+    def _edge_masks(self, mode, valid, free):
+        """
+        Undirected search edges, one entry per direction pair (+d, -d) with d > 0, as
+        (direction, source slices, mask over those sources in array order). An edge is kept when both
+        endpoints are valid nodes and the raytraced edge rule lets the search cross it both ways
+        (NOT ALL intersected cells occupied).
+        """
+        node_shape = np.array(valid.shape)
+        padded_free = np.pad(free, (1, 2), mode='constant', constant_values=False)
+        edge_cells = dict(zip(self.valid_directions, self.edge_cell_offsets(mode)))
+        
+        def any_free(cells, lo, hi):
+            """For sources in [lo, hi) (array order), is any intersected cell free?"""
+            crossable = np.zeros(hi - lo, dtype=bool)
+            for cell in cells[:, ::-1]:
+                window = tuple(slice(int(l + c + 1), int(h + c + 1)) for l, c, h in zip(lo, cell, hi))
+                crossable |= padded_free[window]
+            return crossable
+        
+        for direction in self.valid_directions:
+            if direction < (0,) * self.dimensions:
+                continue  # Covered by the opposite direction
+            step = np.array(direction[::-1])  # Array order
+            lo = np.maximum(-step, 0)
+            hi = node_shape - np.maximum(step, 0)
+            sources = tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))
+            if np.any(hi <= lo):
+                yield direction, sources, np.zeros(np.maximum(hi - lo, 0), dtype=bool)
+                continue
+            targets = tuple(slice(int(l + s), int(h + s)) for l, s, h in zip(lo, step, hi))
+            
+            edge = valid[sources] & valid[targets]
+            edge &= any_free(edge_cells[direction], lo, hi)
+            edge &= any_free(edge_cells[tuple(-d for d in direction)], lo + step, hi + step)
+            yield direction, sources, edge
+    
+    def _edge_groups(self, mode, valid, free):
+        """Undirected search edges as (sources, delta) groups over flat node indices."""
+        node_strides = np.array(valid.strides[::-1], dtype=np.int64) // valid.itemsize  # Coordinate order
+        groups = []
+        for direction, sources, edge in self._edge_masks(mode, valid, free):
+            mask = np.zeros(valid.shape, dtype=bool)
+            mask[sources] = edge
+            groups.append((np.flatnonzero(mask), int(np.dot(direction, node_strides))))
+        return groups
+    
+    def component_labels(self, mode):
+        """
+        Connected-component label of every search node (array order, int32) under the 'loose'
+        directions and the raytracing edge rule; -1 marks occupied cells in cell mode. Built once
+        per mode and rebuilt after update_cells. None when the grid is not a dense array (sparse
+        and out-of-core containers are never densified).
+        """
+        if not isinstance(self.occupancy_grid, np.ndarray):
+            return None
+        with self._cache_lock:
+            if mode not in self._component_labels:
+                free = self._node_space_free(mode)
+                valid = free if mode == 'cell' else np.ones(free.shape, dtype=bool)
+                labels = label_components(valid.size, self._edge_groups(mode, valid, free)).reshape(valid.shape)
+                labels[~valid] = -1
+                self._component_labels[mode] = labels
+            return self._component_labels[mode]
+    
+    def has_component_labels(self, mode):
+        """True if the component labels for the mode are already built (or adopted)."""
+        return mode in self._component_labels
+    
+    def are_connected(self, start_coords, end_coords, mode):
+        """
+        True if a search from the start node can reach the end node (node coordinates); False when
+        either lies outside the mode's node bounds. Two label lookups, so unreachable queries are
+        rejected without a search. Builds the labels on first use; needs a dense ndarray grid.
+        """
+        start = np.asarray(start_coords, dtype=np.int64)
+        end = np.asarray(end_coords, dtype=np.int64)
+        bounds = self.num_cells if mode == 'cell' else self.num_vertices
+        if not all(len(c) == self.dimensions and np.all((c >= 0) & (c < bounds)) for c in (start, end)):
+            return False
+        if np.array_equal(start, end):
+            return True
+        labels = self.component_labels(mode)
+        if labels is None:
+            raise ValueError("Connectivity queries need a dense ndarray occupancy grid")
+        end_label = labels[tuple(end[::-1])]
+        if end_label < 0:
+            return False  # Cell-mode edges only ever enter free cells
+        start_label = labels[tuple(start[::-1])]
+        if start_label >= 0:
+            return bool(start_label == end_label)
+        
+        # An occupied start cell can still step into any adjacent free cell
+        neighbors = start + self.direction_array()
+        neighbors = neighbors[np.all((neighbors >= 0) & (neighbors < bounds), axis=1)]
+        return bool(np.any(labels[tuple(neighbors[:, ::-1].T)] == end_label))
+    
+    # Vertex-mode precomputation
+    def vertex_enclosed(self):
+        """
+        Vertices (node coordinates, array order) whose 2^D surrounding cells are all occupied or out of
+        bounds. Every edge of such a vertex only crosses those cells, so the search can never move
+        to or from it. Computed as a pairwise min-reduction along each axis of the padded occupancy.
+        """
+        with self._cache_lock:
+            if self._vertex_enclosed is None:
+                # Cell c sits at padded index c + 1, so the cells around vertex v are padded [v, v + 1]
+                enclosed = np.pad(~self._node_space_free('vertex'), [(1, 0)] * self.dimensions,
+                                  mode='constant', constant_values=True)
+                for axis in range(self.dimensions):
+                    lower = [slice(None)] * self.dimensions
+                    upper = [slice(None)] * self.dimensions
+                    lower[axis] = slice(0, -1)
+                    upper[axis] = slice(1, None)
+                    enclosed = enclosed[tuple(lower)] & enclosed[tuple(upper)]
+                self._vertex_enclosed = enclosed
+            return self._vertex_enclosed
+    
+    def is_vertex_enclosed(self, vertex_coords):
+        """
+        True if the vertex (node coordinates within vertex bounds) is enclosed by occupied cells.
+        Reads only its 2^D surrounding cells, so no container is densified for a single check;
+        vertex_enclosed() is the whole-grid table.
+        """
+        corners = np.indices((2,) * self.dimensions).reshape(self.dimensions, -1).T
+        cells = np.asarray(vertex_coords, dtype=np.int64) - 1 + corners
+        return bool(self.occupied_many(cells).all())
+    
+    def half_directions(self):
+        """The valid directions d > 0; each undirected edge is stored once, along +d."""
+        return [direction for direction in self.valid_directions if direction > (0,) * self.dimensions]
+    
+    def vertex_edge_words(self):
+        """
+        Traversable vertex-mode edges over the padded layout, one unsigned word per vertex: bit j of
+        vertex v is set when the edge v -> v + half_directions()[j] can be crossed (edges are
+        symmetric, so v + d -> v reads the same bit). The search consults these words instead of
+        raytracing each edge. None when the grid is not a dense array or there are more than 64
+        half directions.
+        """
+        with self._cache_lock:
+            if self._vertex_edge_words is None and self.padded_occupancy is not None:
+                num_bits = len(self.half_directions())
+                dtype = next((t for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                              if np.dtype(t).itemsize * 8 >= num_bits), None)
+                if dtype is None:
+                    return None
+                
+                free = self._node_space_free('vertex')
+                words = np.zeros(self.padded_occupancy.shape, dtype=dtype)
+                masks = self._edge_masks('vertex', np.ones(free.shape, dtype=bool), free)
+                for bit, (_, sources, edge) in enumerate(masks):
+                    padded_sources = tuple(slice(s.start + 1, s.stop + 1) for s in sources)
+                    words[padded_sources] |= edge.astype(dtype) << dtype(bit)
+                self._vertex_edge_words = words.ravel()
+            return self._vertex_edge_words
@@ -0,0 +1,42 @@
+import numpy as np
+
+"""
+Vectorized connected-component labeling over flat node indices.
+
+Edges are given per direction as (sources, delta): node 'sources[i]' is joined to node
+'sources[i] + delta'. Components are found with a data-parallel union-find: every round hooks
+the larger root of each unmerged edge onto the smaller one (np.minimum.at), then compresses all
+parent pointers by pointer jumping. Parents only ever decrease, so no cycles can form, and edges
+whose endpoints already share a root are dropped for good, so later rounds only touch the
+edges that still matter. A component's label is its smallest node index. Labels are int32
+whenever the node count allows it, halving the memory of the parent array.
+"""
+
+def label_components(num_nodes, edges):
+    """Component label of every node for a list of (sources, delta) edge groups; returns an int32 (or int64) array."""
+    dtype = np.int32 if num_nodes <= np.iinfo(np.int32).max else np.int64
+    parent = np.arange(num_nodes, dtype=dtype)
+    edges = [(np.asarray(sources, dtype=dtype), int(delta)) for sources, delta in edges]
+
+    while edges:
+        remaining = []
+        for sources, delta in edges:
+            roots_u = parent[sources]
+            roots_v = parent[sources + delta]
+            active = roots_u != roots_v
+            if not active.any():
+                continue  # Every edge of this group is inside a single component already
+            sources, roots_u, roots_v = sources[active], roots_u[active], roots_v[active]
+            np.minimum.at(parent, np.maximum(roots_u, roots_v), np.minimum(roots_u, roots_v))
+            remaining.append((sources, delta))
+        _compress(parent)
+        edges = remaining
+    return parent
+
+def _compress(parent):
+    """Pointer jumping until every node points straight at its root (in place)."""
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return
+        parent[:] = grandparent
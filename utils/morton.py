@@ -0,0 +1,166 @@
+import numpy as np
+from functools import lru_cache
+
+"""
+Morton (Z-order) memory layout for N-dimensional occupancy grids.
+
+Cell indices are mapped to a single code by interleaving the bits of every axis, so cells
+that are close in space are close in memory: a 3^D neighborhood or a short ray touches a
+handful of cache lines instead of one line per row/plane as in the row-major layout.
+
+Axes may have different bit counts (ceil(log2(size))); bit levels are interleaved round-robin,
+skipping axes that have run out of bits, so elongated grids do not pay for a full cube.
+The last array axis (x) takes the least significant bit of every level, like row-major.
+
+Neighbor offsets cannot be a constant flat delta in Morton order, so directions are converted
+once into "dilated" per-axis deltas and applied with the classic Morton addition
+((code | ~mask) + delta) & mask per axis.
+"""
+class MortonLayout:
+    def __init__(self, shape):
+        self.shape = tuple(int(s) for s in shape)
+        self.ndim = len(self.shape)
+        self.axis_bits = [int(np.ceil(np.log2(s))) if s > 1 else 0 for s in self.shape]
+
+        # Assign output bit positions level by level, x (last array axis) first
+        self.bit_positions = [[] for _ in range(self.ndim)]
+        position = 0
+        for level in range(max(self.axis_bits, default=0)):
+            for axis in range(self.ndim - 1, -1, -1):
+                if level < self.axis_bits[axis]:
+                    self.bit_positions[axis].append(position)
+                    position += 1
+        self.total_bits = position
+        self.size = 1 << self.total_bits  # Number of addressable codes
+
+        self.axis_masks = np.array([sum(1 << p for p in positions) for positions in self.bit_positions], dtype=np.int64)
+
+        # Per-axis lookup tables: table[axis][v] is v with its bits spread to the axis positions
+        self.tables = [self.dilate(axis, np.arange(1 << bits, dtype=np.int64)) for axis, bits in enumerate(self.axis_bits)]
+        self._tables = [table.tolist() for table in self.tables]  # Python lists for the scalar fast path
+
+    def dilate(self, axis, values):
+        """Spread the bits of per-axis values into that axis' Morton bit positions."""
+        values = np.asarray(values, dtype=np.int64)
+        out = np.zeros(values.shape, dtype=np.int64)
+        for level, position in enumerate(self.bit_positions[axis]):
+            out |= ((values >> level) & 1) << position
+        return out
+
+    def encode(self, array_indices):
+        """Morton codes for a tuple of (scalar or array) indices in array order."""
+        code = 0
+        for axis, idx in enumerate(array_indices):
+            code = code | self.tables[axis][np.asarray(idx, dtype=np.int64)]
+        return code
+
+    def encode_scalar(self, array_indices):
+        code = 0
+        for axis, idx in enumerate(array_indices):
+            code |= self._tables[axis][idx]
+        return code
+
+    def decode(self, codes):
+        """Array-order index tuple for an array of Morton codes."""
+        codes = np.asarray(codes, dtype=np.int64)
+        indices = []
+        for positions in self.bit_positions:
+            idx = np.zeros(codes.shape, dtype=np.int64)
+            for level, position in enumerate(positions):
+                idx |= ((codes >> position) & 1) << level
+            indices.append(idx)
+        return tuple(indices)
+
+    def direction_deltas(self, directions):
+        """
+        Dilated deltas for array-order direction vectors, one row per direction and axis.
+        Negative components are stored in two's complement within the axis mask.
+        """
+        directions = np.atleast_2d(np.asarray(directions, dtype=np.int64))
+        deltas = np.empty(directions.shape, dtype=np.int64)
+        for axis, bits in enumerate(self.axis_bits):
+            deltas[:, axis] = self.dilate(axis, directions[:, axis] & ((1 << bits) - 1))
+        return deltas
+
+    def add(self, codes, deltas):
+        """
+        Morton addition of dilated per-axis deltas (from direction_deltas) to codes.
+        Results wrap within each axis, so callers still check bounds on the moved axes.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        out = np.zeros(np.broadcast_shapes(codes.shape, np.shape(deltas)[:-1]), dtype=np.int64)
+        for axis, mask in enumerate(self.axis_masks):
+            out |= ((codes | ~mask) + deltas[..., axis]) & mask
+        return out
+
+@lru_cache(maxsize=None)
+def morton_layout(shape):
+    """Shared MortonLayout for a grid shape (array order)."""
+    return MortonLayout(shape)
+
+def morton_encode(array_indices, shape):
+    """Morton codes for array-order indices of a grid with the given shape."""
+    return morton_layout(tuple(shape)).encode(array_indices)
+
+def morton_decode(codes, shape):
+    """Array-order indices for Morton codes of a grid with the given shape."""
+    return morton_layout(tuple(shape)).decode(codes)
+
+"""
+Occupancy grid stored in Morton order.
+
+The container is array-like (shape in array order, tuple indexing with scalars or integer
+arrays), so it can be used by Grid via Grid(storage='morton'). Codes that fall outside the
+grid shape (padding up to the next power of two per axis) are stored as occupied.
+"""
+class MortonGrid:
+    def __init__(self, occupancy_grid):
+        occupancy = np.asarray(occupancy_grid) != 0
+        self.shape = occupancy.shape
+        self.ndim = occupancy.ndim
+        self.layout = morton_layout(self.shape)
+
+        self.cells = np.ones(self.layout.size, dtype=bool)
+        self.cells[self.layout.encode(np.indices(self.shape).reshape(self.ndim, -1))] = occupancy.ravel()
+
+    def gather(self, codes):
+        """Vectorized occupancy for an array of Morton codes."""
+        return self.cells[codes]
+
+    def neighbor_codes(self, code, directions):
+        """Morton codes of code + direction for every array-order direction (unchecked bounds)."""
+        return self.layout.add(code, self.layout.direction_deltas(directions))
+
+    def __getitem__(self, array_indices):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        if len(array_indices) != self.ndim:
+            raise IndexError(f"expected {self.ndim} indices, got {len(array_indices)}")
+
+        if all(isinstance(i, (int, np.integer)) for i in array_indices):
+            for axis, i in enumerate(array_indices):
+                if i < 0 or i >= self.shape[axis]:
+                    raise IndexError(f"index {i} is out of bounds for axis {axis} with size {self.shape[axis]}")
+            return bool(self.cells[self.layout.encode_scalar([int(i) for i in array_indices])])
+
+        indices = np.broadcast_arrays(*[np.asarray(i, dtype=np.int64) for i in array_indices])
+        for axis, idx in enumerate(indices):
+            if np.any((idx < 0) | (idx >= self.shape[axis])):
+                raise IndexError(f"index out of bounds for axis {axis} with size {self.shape[axis]}")
+        return self.cells[self.layout.encode(indices)]
+
+    def __setitem__(self, array_indices, occupied):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        self.cells[self.layout.encode(array_indices)] = np.asarray(occupied) != 0
+
+    def to_array(self):
+        return self.cells[self.layout.encode(np.indices(self.shape))]
+
+    def __array__(self, dtype=None, copy=None):
+        occupancy = self.to_array()
+        return occupancy if dtype is None else occupancy.astype(dtype)
+
+    @property
+    def nbytes(self):
+        return self.cells.nbytes
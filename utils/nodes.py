@@ -32,6 +32,17 @@ class Nodes:
         
         return self.nodes[coords_tuple]
     
+    def get_node_unchecked(self, coords_tuple):
+        """getNode for coordinates already known to be valid (e.g. via a padded node mask)."""
+        node = self.nodes.get(coords_tuple)
+        if node is None:
+            node = self.nodes[coords_tuple] = Node(coords_tuple)
+        return node
+    
+    def reset(self):
+        """Forget all nodes so the store can be reused for another search."""
+        self.nodes.clear()
+    
     def get_created_nodes_count(self):
         return len(self.nodes)
     
@@ -0,0 +1,200 @@
+import numpy as np
+
+FREE_LEAF = -1      # Child code for a homogeneous free region
+OCCUPIED_LEAF = -2  # Child code for a homogeneous occupied region
+
+"""
+N-dimensional 2^N-tree (quadtree in 2D, octree in 3D, hyperoctree beyond) occupancy container.
+
+The tree covers a power-of-two cube that encloses the grid shape. Every internal node
+splits its region in half along every axis, giving 2^N children. Regions that are
+entirely free or entirely occupied collapse into a single leaf, so memory scales with
+the obstacle surface instead of the grid volume.
+
+The container mirrors the parts of the numpy array interface used by Grid and
+Cartographer ('shape', 'ndim' and tuple indexing in array order), so it can be passed
+anywhere an occupancy_grid ndarray is expected:
+- tree[z, y, x] returns the occupancy of a single cell
+- tree[zs, ys, xs] with integer arrays gathers many cells at once
+"""
+class NTree:
+    def __init__(self, shape, occupied=False):
+        self.shape = tuple(int(s) for s in shape)
+        self.ndim = len(self.shape)
+        if self.ndim < 1 or min(self.shape) < 1:
+            raise ValueError(f"shape must have at least one dimension of positive size, got {self.shape}")
+
+        self.depth = int(np.ceil(np.log2(max(self.shape))))  # Levels below the root
+        self.size = 1 << self.depth                          # Edge length of the root cube
+        self.branching = 1 << self.ndim                      # 2^N children per node
+
+        # Node table: row i holds the child codes of node i (>= 0 node index, < 0 leaf)
+        self.children = np.empty((0, self.branching), dtype=np.int32)
+        self.num_rows = 0    # Rows handed out so far (used or on the free list)
+        self.free_rows = []
+        self.root = OCCUPIED_LEAF if occupied else FREE_LEAF
+
+        # Per-child offsets in the unit cube, child bit a selects the upper half of axis a
+        self.child_offsets = np.array([[(c >> a) & 1 for a in range(self.ndim)]
+                                       for c in range(self.branching)], dtype=np.int64)
+
+    @classmethod
+    def from_array(cls, occupancy_grid):
+        """Build a tree from a dense occupancy array, merging homogeneous regions."""
+        occupancy = np.asarray(occupancy_grid) != 0
+        tree = cls(occupancy.shape)
+        tree.root = tree._build(occupancy, np.zeros(tree.ndim, dtype=np.int64), tree.size)
+        return tree
+
+    def _build(self, occupancy, node_lo, size):
+        region = self._clip_region(node_lo, size)
+        if region is None:
+            return FREE_LEAF  # Region lies entirely outside the grid
+
+        block = occupancy[region]
+        if block.all():
+            return OCCUPIED_LEAF
+        if not block.any():
+            return FREE_LEAF
+
+        node = self._allocate(FREE_LEAF)
+        half = size // 2
+        for c, offset in enumerate(self.child_offsets):
+            self.children[node, c] = self._build(occupancy, node_lo + offset * half, half)
+        return node
+
+    def _clip_region(self, node_lo, size):
+        """Slices of the node region clipped to the grid shape, or None when empty."""
+        hi = np.minimum(node_lo + size, self.shape)
+        if np.any(hi <= node_lo):
+            return None
+        return tuple(slice(int(l), int(h)) for l, h in zip(node_lo, hi))
+
+    def _allocate(self, leaf_code):
+        if self.free_rows:
+            node = self.free_rows.pop()
+        else:
+            node = self.num_rows
+            if node == self.children.shape[0]:
+                # Grow the node table geometrically
+                grown = np.empty((max(1, 2 * node), self.branching), dtype=np.int32)
+                grown[:node] = self.children[:node]
+                self.children = grown
+            self.num_rows += 1
+        self.children[node, :] = leaf_code
+        return node
+
+    def _release(self, code):
+        """Return a subtree's rows to the free list."""
+        if code < 0:
+            return
+        for child in self.children[code]:
+            self._release(int(child))
+        self.free_rows.append(code)
+
+    def set_box(self, lo, hi, occupied=True):
+        """Set every cell in the half-open array-index box [lo, hi) to the given occupancy."""
+        lo = np.maximum(np.array(lo, dtype=np.int64), 0)
+        hi = np.minimum(np.array(hi, dtype=np.int64), self.shape)
+        if len(lo) != self.ndim or len(hi) != self.ndim:
+            raise ValueError(f"box corners must have {self.ndim} indices")
+        if np.any(hi <= lo):
+            return
+        leaf = OCCUPIED_LEAF if occupied else FREE_LEAF
+        self.root = self._set(self.root, np.zeros(self.ndim, dtype=np.int64), self.size, lo, hi, leaf)
+
+    def _set(self, code, node_lo, size, lo, hi, leaf):
+        # Only the part of the node inside the grid matters for coverage
+        node_hi = np.minimum(node_lo + size, self.shape)
+        if np.any(hi <= node_lo) or np.any(lo >= node_hi):
+            return code  # No overlap with the box
+        if code == leaf:
+            return code  # Already homogeneous with the requested value
+        if np.all(lo <= node_lo) and np.all(hi >= node_hi):
+            self._release(code)
+            return leaf  # Box covers the whole node
+
+        if code < 0:
+            code = self._allocate(code)  # Split the leaf into 2^N identical children
+
+        half = size // 2
+        for c, offset in enumerate(self.child_offsets):
+            child_lo = node_lo + offset * half
+            if np.any(child_lo >= self.shape):
+                # Children outside the grid are never queried, let them follow the edit so they can merge
+                self.children[code, c] = leaf
+                continue
+            child = int(self.children[code, c])
+            self.children[code, c] = self._set(child, child_lo, half, lo, hi, leaf)
+
+        # Merge children back into a leaf when they became homogeneous
+        first = self.children[code, 0]
+        if first < 0 and np.all(self.children[code] == first):
+            self.free_rows.append(code)
+            return int(first)
+        return code
+
+    def gather(self, array_indices):
+        """Vectorized occupancy lookup for a tuple of integer index arrays (array order)."""
+        indices = np.broadcast_arrays(*[np.asarray(i, dtype=np.int64) for i in array_indices])
+        out_shape = indices[0].shape
+        indices = [i.ravel() for i in indices]
+
+        for axis, idx in enumerate(indices):
+            if np.any((idx < 0) | (idx >= self.shape[axis])):
+                raise IndexError(f"index out of bounds for axis {axis} with size {self.shape[axis]}")
+
+        codes = np.full(indices[0].shape, self.root, dtype=np.int32)
+        for level in range(self.depth - 1, -1, -1):
+            active = np.nonzero(codes >= 0)[0]
+            if active.size == 0:
+                break
+            child = np.zeros(active.size, dtype=np.int64)
+            for axis, idx in enumerate(indices):
+                child |= ((idx[active] >> level) & 1) << axis
+            codes[active] = self.children[codes[active], child]
+
+        return (codes == OCCUPIED_LEAF).reshape(out_shape)
+
+    def __getitem__(self, array_indices):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        if len(array_indices) != self.ndim:
+            raise IndexError(f"expected {self.ndim} indices, got {len(array_indices)}")
+        result = self.gather(array_indices)
+        return bool(result) if result.ndim == 0 else result
+
+    def __setitem__(self, array_indices, occupied):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        lo = np.array(array_indices, dtype=np.int64)
+        self.set_box(lo, lo + 1, bool(occupied))
+
+    def to_array(self):
+        """Expand the tree into a dense boolean array."""
+        occupancy = np.zeros(self.shape, dtype=bool)
+        self._fill(occupancy, self.root, np.zeros(self.ndim, dtype=np.int64), self.size)
+        return occupancy
+
+    def _fill(self, occupancy, code, node_lo, size):
+        region = self._clip_region(node_lo, size)
+        if region is None:
+            return
+        if code < 0:
+            occupancy[region] = code == OCCUPIED_LEAF
+            return
+        half = size // 2
+        for c, offset in enumerate(self.child_offsets):
+            self._fill(occupancy, int(self.children[code, c]), node_lo + offset * half, half)
+
+    def __array__(self, dtype=None, copy=None):
+        occupancy = self.to_array()
+        return occupancy if dtype is None else occupancy.astype(dtype)
+
+    def node_count(self):
+        """Number of internal nodes currently in use."""
+        return self.num_rows - len(self.free_rows)
+
+    @property
+    def nbytes(self):
+        return self.node_count() * self.branching * self.children.itemsize
@@ -0,0 +1,121 @@
+import os
+import sys
+from collections import OrderedDict
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.chunked import group_by_chunk
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024  # Default resident chunk budget (64 MiB)
+
+"""
+Out-of-core occupancy grid backed by a memory-mapped file with a chunk-level LRU cache.
+
+The file is opened with np.memmap (raw files) or np.load(mmap_mode='r') (.npy files), so
+nothing is read until a query touches it. Queries are grouped per chunk; each chunk is
+copied out of the mapping once, kept in an LRU cache and evicted when the resident size
+exceeds 'cache_bytes'. Peak memory is therefore bounded by the cache budget plus one chunk.
+
+The container is array-like (shape in array order, tuple indexing with scalars or integer
+arrays), so it can be passed to Grid, PathPlanner and Cartographer in place of an ndarray.
+"""
+class PagedGrid:
+    def __init__(self, source, shape=None, dtype=None, offset=0, chunk_shape=64, cache_bytes=DEFAULT_CACHE_BYTES):
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            if path.endswith('.npy'):
+                self.data = np.load(path, mmap_mode='r')
+            else:
+                if shape is None or dtype is None:
+                    raise ValueError("shape and dtype are required to map a raw occupancy file")
+                self.data = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=tuple(shape))
+        else:
+            self.data = source  # Already mapped (or in-memory) array
+
+        self.shape = tuple(int(s) for s in self.data.shape)
+        self.ndim = len(self.shape)
+
+        # Chunk edge length per array axis (a scalar applies to every axis)
+        self.chunk_shape = np.broadcast_to(np.array(chunk_shape, dtype=np.int64), (self.ndim,)).copy()
+        if np.any(self.chunk_shape < 1):
+            raise ValueError("chunk_shape must be positive")
+
+        self.cache_bytes = int(cache_bytes)
+        self.cache = OrderedDict()  # chunk key -> in-memory chunk copy, least recently used first
+        self.resident_bytes = 0
+
+        # Page counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_chunk(self, key):
+        chunk = self.cache.get(key)
+        if chunk is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return chunk
+
+        self.misses += 1
+        lo = np.array(key, dtype=np.int64) * self.chunk_shape
+        hi = np.minimum(lo + self.chunk_shape, self.shape)
+        chunk = np.array(self.data[tuple(slice(int(l), int(h)) for l, h in zip(lo, hi))])  # Page in
+
+        # Evict least recently used chunks until the new one fits the budget
+        while self.cache and self.resident_bytes + chunk.nbytes > self.cache_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.resident_bytes -= evicted.nbytes
+            self.evictions += 1
+
+        self.cache[key] = chunk
+        self.resident_bytes += chunk.nbytes
+        return chunk
+
+    def gather(self, array_indices):
+        """Vectorized lookup for a tuple of integer index arrays (array order)."""
+        indices = np.broadcast_arrays(*[np.asarray(i, dtype=np.int64) for i in array_indices])
+        out_shape = indices[0].shape
+        coords = np.stack([i.ravel() for i in indices], axis=1)
+
+        for axis in range(self.ndim):
+            if np.any((coords[:, axis] < 0) | (coords[:, axis] >= self.shape[axis])):
+                raise IndexError(f"index out of bounds for axis {axis} with size {self.shape[axis]}")
+
+        values = np.empty(len(coords), dtype=self.data.dtype)
+        if len(coords) == 0:
+            return values.reshape(out_shape)
+        for key, rows, local in group_by_chunk(coords, self.chunk_shape):
+            values[rows] = self._load_chunk(key)[tuple(local.T)]
+        return values.reshape(out_shape)
+
+    def __getitem__(self, array_indices):
+        if not isinstance(array_indices, tuple):
+            array_indices = (array_indices,)
+        if len(array_indices) != self.ndim:
+            raise IndexError(f"expected {self.ndim} indices, got {len(array_indices)}")
+        values = self.gather(array_indices)
+        return values[()] if values.ndim == 0 else values
+
+    def __array__(self, dtype=None, copy=None):
+        # Reads the whole file, only meant for grids that fit in memory
+        return np.asarray(self.data, dtype=dtype)
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.resident_bytes = 0
+
+    def stats(self):
+        """Page hit/miss counters and current cache usage."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'resident_chunks': len(self.cache),
+            'resident_bytes': self.resident_bytes,
+            'cache_bytes': self.cache_bytes,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -135,6 +135,25 @@ class Raytracer:
         
         return True
     
+    def advance(self, t):
+        """
+        Jump forward to parameter t without visiting the crossings before it. Crossings are still
+        computed from the ray's own start, so those after t are the same as when stepping with next().
+        """
+        t = min(max(t, self.t), 1.0)
+        for j in range(self.dimensions):
+            if self.delta_x_sign[j] == 0:
+                continue
+            # Count the crossings at or before t with the same formula next() uses
+            k = self.k[j]
+            while self.D0[j] + (k / abs(self.delta_x[j])) <= t:
+                k += 1
+            self.y[j] = self.y[j] + self.delta_x_sign[j] * (k - self.k[j])
+            self.k[j] = k
+            self.D[j] = self.D0[j] + (k / abs(self.delta_x[j]))
+        self.t = t
+        self.x0 = self.start_coords + self.t * self.delta_x
+    
     def trace(self):
         intersected_cells = set()  # Use set to avoid duplicates
         
@@ -0,0 +1,113 @@
+import numpy as np
+
+"""
+Compact result types for planners and the Cartographer.
+
+Results are backed by contiguous int32/float32 arrays, so they pickle small and can be exported
+without copies (buffers() returns memoryviews over the arrays, e.g. for sockets or shared
+memory). The list/dict forms the planners and Cartographer.map() return by default are built
+lazily, on first use, for code that expects them:
+- PathResult behaves like the list of coordinate tuples (len, iteration, indexing, ==)
+- CartographerResult behaves like the result dict (['success'], ['traversed_front_cells'], ...)
+"""
+class PathResult:
+    def __init__(self, points, expanded=None, complete=False):
+        self.points = np.ascontiguousarray(points, dtype=np.float32)       # (N, D) path points
+        if expanded is None:
+            expanded = np.empty((0, self.points.shape[1] if self.points.ndim == 2 else 0))
+        self.expanded = np.ascontiguousarray(expanded, dtype=np.int32)     # (M, D) expanded nodes
+        self.complete = bool(complete)  # False for an attempted path that stops short of the end
+        self._list = None
+
+    @classmethod
+    def from_path(cls, path, dimensions, expanded=None, complete=False):
+        points = np.array(path, dtype=np.float32).reshape(-1, dimensions)
+        if expanded is not None:
+            expanded = np.array(expanded, dtype=np.int32).reshape(-1, dimensions)
+        return cls(points, expanded, complete)
+
+    def to_list(self):
+        """The path as a list of coordinate tuples, built once on first use."""
+        if self._list is None:
+            self._list = [tuple(point) for point in self.points.astype(float).tolist()]
+        return self._list
+
+    def buffers(self):
+        """Zero-copy views of the backing arrays."""
+        return {'points': memoryview(self.points), 'expanded': memoryview(self.expanded)}
+
+    @property
+    def nbytes(self):
+        return self.points.nbytes + self.expanded.nbytes
+
+    def __reduce__(self):
+        return PathResult, (self.points, self.expanded, self.complete)  # Pickle the arrays, never the lazy list
+
+    def __len__(self):
+        return len(self.points)
+
+    def __bool__(self):
+        return len(self.points) > 0
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, PathResult):
+            return np.array_equal(self.points, other.points)
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PathResult({len(self)} points, {len(self.expanded)} expanded, complete={self.complete})"
+
+class CartographerResult:
+    def __init__(self, success, traversed_front_cells, raytracer_position, error=None):
+        self.success = bool(success)
+        self.traversed_front_cells = np.ascontiguousarray(traversed_front_cells, dtype=np.int32)  # (K, D)
+        self.raytracer_position = raytracer_position
+        self.error = error
+        self._dict = None
+
+    def to_dict(self):
+        """The Cartographer.map() result dict, built once on first use."""
+        if self._dict is None:
+            result = {'success': self.success}
+            if self.error is not None:
+                result['error'] = self.error
+            result['traversed_front_cells'] = [tuple(cell) for cell in self.traversed_front_cells.tolist()]
+            result['raytracer_position'] = self.raytracer_position
+            self._dict = result
+        return self._dict
+
+    def buffers(self):
+        """Zero-copy views of the backing arrays."""
+        return {'traversed_front_cells': memoryview(self.traversed_front_cells)}
+
+    @property
+    def nbytes(self):
+        return self.traversed_front_cells.nbytes
+
+    def __reduce__(self):
+        return CartographerResult, (self.success, self.traversed_front_cells, self.raytracer_position, self.error)
+
+    def __getitem__(self, key):
+        if key == 'success':
+            return self.success  # Cheap fields never build the dict
+        return self.to_dict()[key]
+
+    def get(self, key, default=None):
+        return self.to_dict().get(key, default)
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __contains__(self, key):
+        return key in self.to_dict()
+
+    def __repr__(self):
+        return f"CartographerResult(success={self.success}, {len(self.traversed_front_cells)} cells)"
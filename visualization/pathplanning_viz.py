@@ -15,7 +15,7 @@ def visualize_pathplanning(start_coords, end_coords, occupancy_grid, origin=None
     Main visualization function that handles both 2D and 3D path planning visualization.
     """
     # Plan the path
-    path = plan_path(start_coords, end_coords, occupancy_grid, origin=origin, loose=loose, algorithm=algorithm, mode=mode)
+    path = plan_path(start_coords, end_coords, occupancy_grid, origin=origin, loose=loose, algorithm=algorithm, mode=mode, attempted_path=True)
     
     dimensions = len(occupancy_grid.shape)
     